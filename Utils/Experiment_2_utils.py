@@ -1,41 +1,11 @@
-import random
+import numpy as np
 import pandas as pd
 
+from augmentation import ASPECTS, AspectAdjectiveNoun, AugmentationEngine
+from dataset_loader import load, save_csv
 
-def generate_comment(adjectives_pos, adjectives_neg, nouns, sentiment):
-    """Generates random comments for food, service, and atmosphere."""
-    comment = ""
-    for aspect in ["food", "service", "atmosphere"]:
-        if sentiment[aspect] == "Positive":
-            comment += random.choice(adjectives_pos[aspect]) + " " + random.choice(nouns[aspect])
-        if sentiment[aspect] == "Negative":
-            comment += random.choice(adjectives_neg[aspect]) + " " + random.choice(nouns[aspect])
-        comment += " "
-        if comment[0] == " ":
-            comment = comment[1:]
 
-    if comment[-1] == " ":
-        comment = comment[:-1]
-    return comment
-
-
-# Load and filter dataset
-df = pd.read_csv('../raw_data/clean_data.csv')  # Load your dataset
-
-df_low_score = df[df['rating'] < 5]
-
-# Sample 300 reviews with a score of 5
-df_score_5_sample = df[df['rating'] == 5].sample(n=500, random_state=42)
-
-# Combine the two DataFrames
-df_filtered = pd.concat([df_low_score, df_score_5_sample])
-
-# Reset the index if needed
-df_filtered.reset_index(drop=True, inplace=True)
-
-# df = df_filtered
-
-# Balance the dataset by generating synthetic comments if needed
+# Vocabulary for the synthetic comments
 adjectives_positive = {}
 adjectives_negative = {}
 nouns = {}
@@ -139,84 +109,110 @@ nouns['atmosphere'] = [
     "setting", "design", "outlook", "sight", "visuals", "mood"
 ]
 
-# df_ratings_values = df_filtered[["food", "service", "atmosphere"]]
-df_ratings_values = df[["food", "service", "atmosphere"]]
-
-none_count = df_ratings_values.isna().sum().tolist()
-positive_count = (df_ratings_values == 'Positive').sum().tolist()
-negative_count = (df_ratings_values == 'Negative').sum().tolist()
-
-food_ratings_number = [none_count[0], positive_count[0], negative_count[0]]
-service_ratings_number = [none_count[1], positive_count[1], negative_count[1]]
-atmosphere_ratings_number = [none_count[2], positive_count[2], negative_count[2]]
-
-missed_food_comments = [max(food_ratings_number) - i for i in food_ratings_number]
-missed_service_comments = [max(service_ratings_number) - i for i in service_ratings_number]
-missed_atmosphere_comments = [max(atmosphere_ratings_number) - i for i in atmosphere_ratings_number]
-
-print(food_ratings_number)
-print(service_ratings_number)
-print(atmosphere_ratings_number)
-
-print(missed_food_comments)
-print(missed_service_comments)
-print(missed_atmosphere_comments)
-
-missing_comments = {
-    'food': missed_food_comments,
-    'service': missed_service_comments,
-    'atmosphere': missed_atmosphere_comments
-}
-
-added_comments = 0
-
-df_generated = pd.DataFrame(columns=df.columns)
-print(df.columns.values)
-# Generowanie komentarzy do osiągnięcia samych zer
-while any(count > 0 for counts in missing_comments.values() for count in counts):
-    sentiment = {}
-
-    for category, counts in missing_comments.items():
-            if counts[1] > counts[2] and counts[1] > counts[0]:
-                sentiment[category] = "Positive"
-                missing_comments[category][1] -= 1
-            elif counts[2] > counts[0]:
-                sentiment[category] = "Negative"
-                missing_comments[category][2] -= 1
-            else:
-                sentiment[category] = None
-                missing_comments[category][0] -= 1
-
-    if all(value is None for value in sentiment.values()):
-        category_to_update = random.choice(['food', 'service', 'atmosphere'])
-        Pos_neg = random.choice(["Positive", "Negative"])
-        sentiment[category_to_update] = Pos_neg
-        if Pos_neg == "Positive":
-            missing_comments[category_to_update][0] += 1
-            missing_comments[category_to_update][2] += 1
-        if Pos_neg == "Negative":
-            missing_comments[category_to_update][0] += 1
-            missing_comments[category_to_update][1] += 1
-
-
-    comment = generate_comment(adjectives_positive, adjectives_negative, nouns, sentiment)
-    added_comments += 1
-
-    new_entry = {col: None for col in df.columns}
-    new_entry["food"] = sentiment["food"]
-    new_entry["service"] = sentiment["service"]
-    new_entry["atmosphere"] = sentiment["atmosphere"]
-    new_entry["text"] = comment
-    df_generated = pd.concat([df_generated, pd.DataFrame([new_entry])], ignore_index=True)
-
-
-print(len(df))
-print(added_comments)
-# df.reset_index(drop=True, inplace=True)
-#
-# df.to_csv('../raw_data/filtered_data.csv', index=False)
-
-
-df_generated.to_csv('../raw_data/generated_data.csv', index=False)
-
 
+def plan_sentiments(missing_comments, rng):
+    """Sentiment of every synthetic row, planned up front.
+
+    ``missing_comments[aspect]`` is ``[none, positive, negative]`` as computed
+    below. Every aspect gets as many rows as the largest total: its missing
+    labels, then None, Negative and Positive in turn, so each aspect ends up
+    balanced to within one row. The labels are shuffled with ``rng``.
+
+    Rows left without any sentiment take one label from a row that has
+    several, within the same aspect, so the counts do not change. Only when
+    no such row is left does an aspect get an extra random label.
+    """
+    n_rows = max(sum(max(0, c) for c in counts) for counts in missing_comments.values())
+    sentiments = {}
+    for aspect in ASPECTS:
+        none, positive, negative = (max(0, c) for c in missing_comments[aspect])
+        extra = np.resize(np.array([None, "Negative", "Positive"], dtype=object),
+                          n_rows - none - positive - negative)
+        labels = np.concatenate([np.full(none, None, dtype=object),
+                                 np.full(positive, "Positive", dtype=object),
+                                 np.full(negative, "Negative", dtype=object), extra])
+        sentiments[aspect] = rng.permutation(labels)
+
+    labelled = np.column_stack([sentiments[a] != None for a in ASPECTS])  # noqa: E711
+    empty = np.flatnonzero(~labelled.any(axis=1))
+    # Every labelled row keeps one of its labels and can give away the others
+    slots = rng.permutation(np.argwhere(labelled))
+    _, kept = np.unique(slots[:, 0], return_index=True)
+    spare = np.delete(slots, kept, axis=0)[:len(empty)]
+    for (donor, i), row in zip(spare, empty):
+        column = sentiments[ASPECTS[i]]
+        column[row], column[donor] = column[donor], None
+    for row in empty[len(spare):]:
+        aspect = ASPECTS[rng.integers(len(ASPECTS))]
+        sentiments[aspect][row] = "Positive" if rng.integers(2) == 0 else "Negative"
+    return sentiments
+
+
+def generate_synthetic_comments(missing_comments, columns, seed=42, n_jobs=1):
+    """DataFrame of synthetic comments filling ``missing_comments``.
+
+    The sentiment plan is allocated once and the texts are written shard by
+    shard by the augmentation engine; the result only depends on ``seed``.
+    All other ``columns`` are left empty.
+    """
+    sentiments = plan_sentiments(missing_comments, np.random.default_rng(seed))
+    n_rows = len(sentiments[ASPECTS[0]])
+    data = {col: np.full(n_rows, None, dtype=object) for col in columns}
+    data.update(sentiments)
+    plan = pd.DataFrame(data, columns=list(columns))
+
+    engine = AugmentationEngine([AspectAdjectiveNoun(adjectives_positive, adjectives_negative, nouns)],
+                                seed=seed, n_jobs=n_jobs)
+    return engine.run(plan)
+
+
+def balanced_comment_counts(n_rows):
+    """Counts asking for ``n_rows`` rows split evenly across the sentiments."""
+    third = n_rows // 3
+    return {aspect: [n_rows - 2 * third, third, third] for aspect in ASPECTS}
+
+
+def missing_comment_counts(df):
+    """``{aspect: [none, positive, negative]}`` rows to add per sentiment."""
+    ratings = df[ASPECTS]
+    none_count = ratings.isna().sum().tolist()
+    positive_count = (ratings == 'Positive').sum().tolist()
+    negative_count = (ratings == 'Negative').sum().tolist()
+
+    missing = {}
+    for i, aspect in enumerate(ASPECTS):
+        numbers = [none_count[i], positive_count[i], negative_count[i]]
+        missing[aspect] = [max(numbers) - n for n in numbers]
+    return missing
+
+
+if __name__ == '__main__':
+    # Load and filter dataset
+    df = load('../raw_data/clean_data.csv')  # Load your dataset
+
+    df_low_score = df[df['rating'] < 5]
+
+    # Sample 300 reviews with a score of 5
+    df_score_5_sample = df[df['rating'] == 5].sample(n=500, random_state=42)
+
+    # Combine the two DataFrames
+    df_filtered = pd.concat([df_low_score, df_score_5_sample])
+
+    # Reset the index if needed
+    df_filtered.reset_index(drop=True, inplace=True)
+
+    # df = df_filtered
+
+    # df_ratings_values = df_filtered[["food", "service", "atmosphere"]]
+    missing_comments = missing_comment_counts(df)
+    print(missing_comments)
+
+    df_generated = generate_synthetic_comments(missing_comments, df.columns, n_jobs=-1)
+
+    print(len(df))
+    print(len(df_generated))
+    # df.reset_index(drop=True, inplace=True)
+    #
+    # df.to_csv('../raw_data/filtered_data.csv', index=False)
+
+    save_csv(df_generated, '../raw_data/generated_data.csv')
@@ -0,0 +1,325 @@
+"""Concurrent, rate limited crawler for the Google Places API.
+
+Nearby Search and Place Details requests share one pooled aiohttp session.
+A token bucket caps the request rate (QPS), a semaphore bounds the number of
+requests in flight and failed calls are retried with exponential backoff.
+Point ``base_url`` at ``stub_places_server.py`` to crawl without an API key.
+"""
+
+import asyncio
+import random
+import time
+
+import aiohttp
+
+GOOGLE_PLACES_URL = 'https://maps.googleapis.com/maps/api/place'
+
+# Column headers
+unique_places_headers = [
+    'place_id', 'name', 'opening_hours.weekday_text', 'permanently_closed',
+    'adr_address', 'url', 'geometry.location.lng', 'geometry.location.lat',
+    'plus_code.global_code', 'formatted_address', 'rating', 'wheelchair_accessible',
+    'user_ratings_total', 'price_level', 'address_components', 'vicinity',
+    'plus_code.compound_code', 'scope', 'website', 'business_status', 'types'
+]
+
+review_headers = [
+    'place_id', 'author_name', 'language', 'original_language', 'rating',
+    'relative_time_description', 'text', 'time', 'translated'
+]
+
+# HTTP codes and API statuses worth another attempt
+RETRY_HTTP_CODES = {429, 500, 502, 503, 504}
+RETRY_API_STATUSES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+
+class RetryableError(Exception):
+    """Raised for responses that should be retried after a backoff."""
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` requests per second on average."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def place_record(details):
+    """Row for places.csv built from a Place Details ``result``."""
+    return [details.get(header, None) for header in unique_places_headers]
+
+
+def review_records(place_id, details):
+    """Rows for the reviews CSV built from a Place Details ``result``."""
+    return [
+        [
+            place_id,
+            review.get('author_name', None),
+            review.get('language', None),
+            review.get('original_language', None),
+            review.get('rating', None),
+            review.get('relative_time_description', None),
+            review.get('text', None),
+            review.get('time', None),
+            review.get('translated', None)
+        ]
+        for review in details.get('reviews', [])
+    ]
+
+
+class PlacesCrawler:
+    """Crawls Nearby Search and Place Details with bounded concurrency.
+
+    Use as an async context manager so the HTTP session is pooled::
+
+        async with PlacesCrawler(api_key, qps=10) as crawler:
+            places, reviews = await crawler.crawl(locations_coords)
+    """
+
+    def __init__(self, api_key, qps=10, max_concurrency=8, max_retries=4,
+                 backoff=0.5, timeout=30, base_url=GOOGLE_PLACES_URL,
+                 max_pages=3, page_token_delay=2.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_pages = max_pages
+        self.page_token_delay = page_token_delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.bucket = TokenBucket(qps)
+        self.session = None
+        self._semaphore = None
+        self.requests_made = 0
+        self.retries = 0
+        self.failed_places = 0
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    async def _get_once(self, url, params):
+        await self.bucket.acquire()
+        async with self._semaphore:
+            self.requests_made += 1
+            async with self.session.get(url, params=params) as response:
+                if response.status in RETRY_HTTP_CODES:
+                    raise RetryableError(f'HTTP {response.status}')
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+        if payload.get('status') in RETRY_API_STATUSES:
+            raise RetryableError(payload['status'])
+        return payload
+
+    async def get_json(self, endpoint, retry_statuses=(), **params):
+        """GET ``endpoint`` and return the decoded JSON, retrying on failure."""
+        url = f'{self.base_url}/{endpoint}/json'
+        params['key'] = self.api_key
+        for attempt in range(self.max_retries + 1):
+            try:
+                payload = await self._get_once(url, params)
+                if payload.get('status') in retry_statuses:
+                    raise RetryableError(payload['status'])
+                return payload
+            except (RetryableError, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = self.backoff * 2 ** attempt
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def nearby_search(self, location, radius=10000, place_type='restaurant', page_token=None):
+        if page_token is None:
+            return await self.get_json('nearbysearch', location=location,
+                                       radius=radius, type=place_type)
+        # A fresh next_page_token answers INVALID_REQUEST for a short while
+        await asyncio.sleep(self.page_token_delay)
+        return await self.get_json('nearbysearch', retry_statuses=('INVALID_REQUEST',),
+                                   pagetoken=page_token)
+
+    async def place_details(self, place_id):
+        return await self.get_json('details', place_id=place_id)
+
+    async def _crawl_place(self, place_id, city, state):
+        try:
+            place_details = await self.place_details(place_id)
+        except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as error:
+            # Leave the place for the next run instead of aborting the crawl
+            print(f'Place Details failed for {place_id}: {error!r}')
+            self.failed_places += 1
+            state.fail(place_id, city)
+            return
+        if 'result' in place_details:
+            result = place_details['result']
+            state.add_place(place_id, place_record(result), review_records(place_id, result), city)
+        else:
+            state.release(place_id)
+
+    async def _retry_failed(self, state):
+        """Request details again for the places an earlier run failed to get."""
+        retry = {place_id: city for place_id, city in state.failed_places.items() if state.claim(place_id)}
+        await asyncio.gather(*[self._crawl_place(place_id, city, state) for place_id, city in retry.items()])
+
+    async def _crawl_city(self, city, coords, radius, place_type, state, planner=None):
+        """Crawl all result pages of one location, resuming from its cursor."""
+        cursor = state.cursor(city)
+        page, page_token = cursor['page'], cursor['next_page_token']
+        if page > 0 and page_token is None:
+            return
+        while page < self.max_pages:
+            try:
+                places = await self.nearby_search(coords, radius, place_type, page_token)
+            except RetryableError:
+                if page_token is None or page != cursor['page']:
+                    raise
+                # The token saved by an earlier run has expired; start over
+                page, page_token = 0, None
+                continue
+            results = places.get('results', [])
+            new_place_ids = [place['place_id'] for place in results
+                             if place.get('place_id') and state.claim(place['place_id'])]
+            await asyncio.gather(*[self._crawl_place(place_id, city, state) for place_id in new_place_ids])
+
+            page_token = places.get('next_page_token')
+            saturated = planner is not None and planner.record(city, len(results), len(new_place_ids))
+            if saturated or page + 1 == self.max_pages:
+                # Further pages of a saturated tile are unlikely to pay off
+                page_token = None
+            state.complete_page(city, page, page_token)
+            if page_token is None:
+                return
+            page += 1
+
+    async def crawl_tiles(self, planner, place_type='restaurant', state=None):
+        """Crawl the tiles of a :class:`tiling.TilePlanner` wave by wave.
+
+        Each wave holds ``max_concurrency`` tiles, so saturation found by one
+        wave can prune the tiles of the next. Returns rows like :meth:`crawl`.
+        """
+        in_memory = state is None
+        if in_memory:
+            state = InMemoryState()
+        done = {tile_key for tile_key in planner.tiles if state.is_city_done(tile_key)}
+        try:
+            await self._retry_failed(state)
+            while True:
+                wave = planner.next_wave(self.max_concurrency, done)
+                if not wave:
+                    break
+                await asyncio.gather(*[
+                    self._crawl_city(tile_key, planner.location(tile_key), planner.radius,
+                                     place_type, state, planner)
+                    for tile_key in wave
+                ])
+        finally:
+            state.flush()
+        if in_memory:
+            return state.place_rows, state.review_rows
+
+    async def crawl(self, locations_coords, radius=10000, place_type='restaurant',
+                    known_place_ids=(), state=None):
+        """Crawl every location and return ``(place_rows, review_rows)``.
+
+        Places already in ``known_place_ids`` or found by an earlier location
+        are not requested again. With a :class:`crawl_state.CrawlState` the
+        rows go to its sink in batches instead (``None`` is returned), places
+        whose details failed in an earlier run are retried and cities
+        finished by an earlier run are skipped.
+        """
+        in_memory = state is None
+        if in_memory:
+            state = InMemoryState(known_place_ids)
+        try:
+            await self._retry_failed(state)
+            await asyncio.gather(*[
+                self._crawl_city(city, coords, radius, place_type, state)
+                for city, coords in locations_coords.items()
+                if not state.is_city_done(city)
+            ])
+        finally:
+            # Keep whatever was completed before a failure
+            state.flush()
+        if in_memory:
+            return state.place_rows, state.review_rows
+
+
+class InMemoryState:
+    """Minimal stand-in for ``CrawlState`` that just collects the rows."""
+
+    def __init__(self, known_place_ids=()):
+        self.seen_places = set(known_place_ids)
+        self.failed_places = {}
+        self.place_rows = []
+        self.review_rows = []
+
+    def claim(self, place_id):
+        if place_id in self.seen_places:
+            return False
+        self.seen_places.add(place_id)
+        return True
+
+    def release(self, place_id):
+        self.seen_places.discard(place_id)
+
+    def fail(self, place_id, city=None):
+        self.seen_places.discard(place_id)
+
+    def add_place(self, place_id, place_row, review_rows, city=None):
+        self.place_rows.append(place_row)
+        self.review_rows.extend(review_rows)
+
+    def cursor(self, city):
+        return {'page': 0, 'next_page_token': None, 'done': False}
+
+    def is_city_done(self, city):
+        return False
+
+    def complete_page(self, city, page, next_page_token=None):
+        pass
+
+    def flush(self):
+        pass
+
+
+def crawl(locations_coords, api_key, radius=10000, place_type='restaurant',
+          known_place_ids=(), state=None, **crawler_options):
+    """Blocking wrapper around :meth:`PlacesCrawler.crawl`."""
+
+    async def run():
+        async with PlacesCrawler(api_key, **crawler_options) as crawler:
+            return await crawler.crawl(locations_coords, radius, place_type, known_place_ids, state)
+
+    return asyncio.run(run())
+
+
+def crawl_tiles(planner, api_key, place_type='restaurant', state=None, **crawler_options):
+    """Blocking wrapper around :meth:`PlacesCrawler.crawl_tiles`."""
+
+    async def run():
+        async with PlacesCrawler(api_key, **crawler_options) as crawler:
+            return await crawler.crawl_tiles(planner, place_type, state)
+
+    return asyncio.run(run())
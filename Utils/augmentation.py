@@ -0,0 +1,214 @@
+"""Deterministic, shardable text augmentation for the experiment datasets.
+
+An ``AugmentationEngine`` cuts a DataFrame into fixed-size shards and runs a
+list of strategies over each shard as whole columns. Every shard gets its own
+random stream spawned from one seed, so the output depends only on the seed
+and the shard size, never on how many worker processes ran it::
+
+    engine = AugmentationEngine([NullAspectInjection(NegativeTemplate(adjectives))],
+                                seed=42, n_jobs=4)
+    augmented = engine.run(df)
+
+Strategies:
+
+* ``AspectAdjectiveNoun`` - Experiment 2: writes "adjective noun" phrases for
+  the sentiment of every aspect into ``text``.
+* ``NegativeTemplate`` - Experiment 3: negative sentences built from fixed
+  templates.
+* ``NullAspectInjection`` - Experiment 3: picks a share (25%) of the rows
+  whose aspect is null, appends a generated negative comment and labels the
+  aspect Negative.
+
+A strategy with a ``prepare(df, rng)`` method sees the whole frame once
+before sharding, from a random stream of its own, and returns the copy that
+runs on the shards. ``NullAspectInjection`` uses it to draw its rows across
+the whole dataset.
+"""
+
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ASPECTS = ["food", "service", "atmosphere"]
+
+
+def _pick(words, rng, size):
+    words = np.asarray(words, dtype=object)
+    return words[rng.integers(len(words), size=size)]
+
+
+def join_phrases(left, right):
+    """Element-wise ``left + ' ' + right`` skipping empty sides."""
+    return np.where(left == "", right, np.where(right == "", left, left + " " + right))
+
+
+class AspectAdjectiveNoun:
+    """Fills ``text`` with one "adjective noun" phrase per non-null aspect."""
+
+    def __init__(self, adjectives_pos, adjectives_neg, nouns, aspects=ASPECTS):
+        self.adjectives_pos = adjectives_pos
+        self.adjectives_neg = adjectives_neg
+        self.nouns = nouns
+        self.aspects = aspects
+
+    def __call__(self, df, rng):
+        n_rows = len(df)
+        comments = np.full(n_rows, "", dtype=object)
+        for aspect in self.aspects:
+            labels = df[aspect].to_numpy(dtype=object)
+            adjectives = np.where(labels == "Positive",
+                                  _pick(self.adjectives_pos[aspect], rng, n_rows),
+                                  _pick(self.adjectives_neg[aspect], rng, n_rows))
+            phrases = adjectives + " " + _pick(self.nouns[aspect], rng, n_rows)
+            phrases[pd.isna(labels)] = ""
+            comments = join_phrases(comments, phrases)
+        df = df.copy()
+        df["text"] = comments
+        return df
+
+
+# Experiment 3 sentence templates; NOUN and ADJ are the slots
+NEGATIVE_TEMPLATES = [
+    "NOUN bad ADJ not good experience",
+    "experience with NOUN very ADJ not great",
+    "NOUN too ADJ disappointed by it",
+    "expected better but NOUN ADJ not satisfying",
+    "NOUN really ADJ no good feelings",
+    "overall NOUN ADJ would not recommend",
+    "very ADJ NOUN poor quality",
+    "NOUN ADJ not up to par",
+    "NOUN ADJ not worth it",
+    "NOUN ADJ not good enough",
+    "NOUN ADJ not what expected",
+]
+
+NOUN_ALTERNATIVES = {
+    "food": ["meal", "cuisine", "dish", "menu"],
+    "service": ["staff", "assistance", "hospitality", "waitstaff"],
+    "atmosphere": ["ambiance", "vibe", "environment", "decor", 'atmosphere']
+}
+
+
+class NegativeTemplate:
+    """Negative comments from ``NEGATIVE_TEMPLATES`` for one aspect at a time."""
+
+    def __init__(self, adjectives_neg, noun_alternatives=NOUN_ALTERNATIVES, templates=NEGATIVE_TEMPLATES):
+        self.adjectives_neg = adjectives_neg
+        self.noun_alternatives = noun_alternatives
+        self.templates = [template.split(" ") for template in templates]
+
+    def generate(self, aspect, size, rng):
+        """``size`` comments about ``aspect`` as an object array."""
+        adjectives = _pick(self.adjectives_neg[aspect], rng, size)
+        noun_alts = _pick(self.noun_alternatives.get(aspect, [aspect]), rng, size)
+        chosen = rng.integers(len(self.templates), size=size)
+
+        comments = np.empty(size, dtype=object)
+        for t, words in enumerate(self.templates):
+            rows = chosen == t
+            if not rows.any():
+                continue
+            slots = {"NOUN": noun_alts[rows], "ADJ": adjectives[rows]}
+            parts = [slots.get(word, word) for word in words]
+            comment = parts[0]
+            for part in parts[1:]:
+                comment = comment + " " + part
+            comments[rows] = comment
+        return comments
+
+
+class NullAspectInjection:
+    """Labels a ``fraction`` of each aspect's null rows Negative.
+
+    The chosen rows get a comment from ``generator`` appended to their text.
+    At least one row per aspect is picked when there are any nulls. Under
+    an ``AugmentationEngine`` the rows are drawn once over the whole frame,
+    so the fraction does not depend on the shard size; called on its own,
+    the strategy draws them from the frame it is given.
+    """
+
+    def __init__(self, generator, fraction=0.25, aspects=ASPECTS, sentiment="Negative"):
+        self.generator = generator
+        self.fraction = fraction
+        self.aspects = aspects
+        self.sentiment = sentiment
+        self.chosen = None
+
+    def _sample(self, df, aspect, rng):
+        null_rows = np.flatnonzero(df[aspect].isna().to_numpy())
+        if not len(null_rows):
+            return null_rows
+        return rng.choice(null_rows, size=max(1, int(len(null_rows) * self.fraction)), replace=False)
+
+    def prepare(self, df, rng):
+        """Copy of the strategy with the rows of every aspect chosen over all of ``df``."""
+        prepared = copy.copy(self)
+        prepared.chosen = {}
+        for aspect in self.aspects:
+            prepared.chosen[aspect] = np.zeros(len(df), dtype=bool)
+            prepared.chosen[aspect][self._sample(df, aspect, rng)] = True
+        return prepared
+
+    def __call__(self, df, rng):
+        df = df.copy()
+        for aspect in self.aspects:
+            if self.chosen is None:
+                rows = self._sample(df, aspect, rng)
+            else:
+                # Shards keep the positions of the whole frame as their index
+                rows = np.flatnonzero(self.chosen[aspect][df.index.to_numpy()])
+            sample_size = len(rows)
+            if not sample_size:
+                continue
+
+            comments = self.generator.generate(aspect, sample_size, rng)
+            texts = df["text"].to_numpy(dtype=object)[rows]
+            has_text = ~pd.isna(texts)
+            merged = comments.copy()
+            merged[has_text] = pd.Series(texts[has_text] + " " + comments[has_text], dtype=object).str.strip().to_numpy()
+
+            text_col = df.columns.get_loc("text")
+            aspect_col = df.columns.get_loc(aspect)
+            df.iloc[rows, text_col] = merged
+            df.iloc[rows, aspect_col] = self.sentiment
+        return df
+
+
+def _run_shard(strategies, shard, seed_sequence):
+    rng = np.random.default_rng(seed_sequence)
+    for strategy in strategies:
+        shard = strategy(shard, rng)
+    return shard
+
+
+class AugmentationEngine:
+    """Runs ``strategies`` over fixed-size shards, optionally in a process pool.
+
+    Shard ``i`` always uses the ``i``-th stream spawned from ``seed``, so the
+    result is bit-identical for any ``n_jobs``.
+    """
+
+    def __init__(self, strategies, seed=42, shard_size=50000, n_jobs=1):
+        self.strategies = strategies
+        self.seed = seed
+        self.shard_size = shard_size
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+
+    def run(self, df):
+        df = df.reset_index(drop=True)
+        shards = [df.iloc[i:i + self.shard_size] for i in range(0, len(df), self.shard_size)] or [df]
+        # The stream after the shards' ones is for the whole-frame decisions
+        *seeds, prepare_seed = np.random.SeedSequence(self.seed).spawn(len(shards) + 1)
+        prepare_rng = np.random.default_rng(prepare_seed)
+        strategies = [strategy.prepare(df, prepare_rng) if hasattr(strategy, 'prepare') else strategy
+                      for strategy in self.strategies]
+
+        if self.n_jobs > 1 and len(shards) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                results = list(executor.map(_run_shard, [strategies] * len(shards), shards, seeds))
+        else:
+            results = [_run_shard(strategies, shard, seed) for shard, seed in zip(shards, seeds)]
+        return pd.concat(results, ignore_index=True)
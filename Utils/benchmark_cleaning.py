@@ -0,0 +1,46 @@
+"""Rows per second of clean_data() vs clean_data_batch() on a reviews CSV.
+
+Also checks that both produce the same output. Usage::
+
+    python benchmark_cleaning.py ../raw_data/reviews_1.csv --n-jobs 4
+"""
+
+import argparse
+import os
+import time
+
+from cleansed_data import clean_data, clean_data_batch
+from dataset_loader import load
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', nargs='?', default='../raw_data/reviews_1.csv')
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = load(args.path, columns=['text'])['text']
+
+    reference, reference_time = timed(texts.apply, clean_data)
+    runs = {'apply(clean_data)': reference_time}
+    outputs = {}
+    outputs['clean_data_batch'], runs['clean_data_batch'] = timed(
+        clean_data_batch, texts, chunk_size=args.chunk_size)
+    outputs[f'clean_data_batch n_jobs={args.n_jobs}'], runs[f'clean_data_batch n_jobs={args.n_jobs}'] = timed(
+        clean_data_batch, texts, chunk_size=args.chunk_size, n_jobs=args.n_jobs)
+
+    for name, output in outputs.items():
+        if not reference.fillna('<NA>').equals(output.fillna('<NA>')):
+            raise AssertionError(f'{name} output differs from clean_data')
+
+    print(f'{len(texts)} rows from {args.path}')
+    for name, seconds in runs.items():
+        print(f'{name:<32} {seconds:8.2f} s {len(texts) / seconds:10.0f} rows/s '
+              f'{reference_time / seconds:6.1f}x')
@@ -0,0 +1,75 @@
+"""JointAspectClassifier vs MultiOutputClassifier(LogisticRegression).
+
+Both models are fitted on the same TF-IDF features of a reviews CSV. The
+script compares fit time, serialized model size, predict latency for a
+single review and for a batch, and per-aspect test accuracy. Usage::
+
+    python benchmark_joint.py --data ../raw_data/clean_data.csv --repeat 20
+"""
+
+import argparse
+import io
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputClassifier
+
+from dataset_loader import load
+from features import FeatureStore
+from joint_model import JointAspectClassifier
+from model_comparison import encode_labels
+from review_classifier import ASPECTS
+
+
+def timed(function, *args, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return result, float(np.median(timings))
+
+
+def model_size(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='../raw_data/clean_data.csv')
+    parser.add_argument('--features', default='../features', help='feature store directory')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    df, labels = encode_labels(load(args.data))
+    X, _ = FeatureStore(args.features).featurize(df['text'].astype(str))
+    X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
+    batch = X[np.resize(np.arange(X.shape[0]), args.batch_size)]
+
+    models = {
+        'MultiOutputClassifier(LR)': MultiOutputClassifier(LogisticRegression(max_iter=1000)),
+        'JointAspectClassifier': JointAspectClassifier(),
+    }
+    rows = []
+    for name, model in models.items():
+        _, fit_seconds = timed(model.fit, X_train, y_train)
+        _, single_seconds = timed(model.predict, X_test[:1], repeat=args.repeat)
+        _, batch_seconds = timed(model.predict, batch, repeat=max(1, args.repeat // 4))
+        predicted = model.predict(X_test)
+        row = {'model': name, 'fit_s': fit_seconds, 'size_kb': model_size(model) / 1024,
+               'predict_1_ms': single_seconds * 1000,
+               f'predict_{args.batch_size}_ms': batch_seconds * 1000}
+        for i, aspect in enumerate(ASPECTS):
+            row[f'{aspect}_accuracy'] = (predicted[:, i] == y_test[:, i]).mean()
+        rows.append(row)
+
+    print(f'{X.shape[0]} reviews, {X.shape[1]} features')
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(pd.DataFrame(rows).set_index('model').round(3))
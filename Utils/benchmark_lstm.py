@@ -0,0 +1,71 @@
+"""Inference throughput of the LSTM (Keras, TFLite) vs the TF-IDF classifiers.
+
+The LSTM is timed twice: padded to ``max_len`` like first_model.ipynb, and
+with length-bucketed batches. Pass saved artifacts of the models to compare::
+
+    python benchmark_lstm.py --lstm ../models/lstm --tfidf ../models/lr ../models/joint
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from dataset_loader import load
+from lstm_classifier import LSTMReviewClassifier, TFLiteReviewClassifier
+from review_classifier import RestaurantReviewClassifier
+
+
+def throughput(function, texts, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(texts)
+        timings.append(time.perf_counter() - start)
+    return len(texts) / float(np.median(timings))
+
+
+def fixed_padding(classifier, batch_size):
+    """The notebook's inference: every review padded to ``max_len``."""
+    def run(texts):
+        sequences = classifier._encode(texts)
+        for i in range(0, len(sequences), batch_size):
+            chunk = sequences[i:i + batch_size]
+            batch = np.zeros((len(chunk), classifier.max_len), dtype=np.int32)
+            for row, sequence in enumerate(chunk):
+                sequence = sequence[-classifier.max_len:]
+                if sequence:
+                    batch[row, -len(sequence):] = sequence
+            classifier._run(batch)
+    return run
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='../raw_data/clean_data.csv')
+    parser.add_argument('--lstm', required=True, help='artifact directory written by LSTMReviewClassifier.save')
+    parser.add_argument('--tfidf', nargs='*', default=[], help='RestaurantReviewClassifier artifact directories')
+    parser.add_argument('--texts', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = np.resize(load(args.data, columns=['text'])['text'].dropna().astype(str).to_numpy(), args.texts).tolist()
+    lstm = LSTMReviewClassifier.load(args.lstm)
+
+    runs = {
+        f'LSTM keras, padded to {lstm.max_len}': fixed_padding(lstm, args.batch_size),
+        'LSTM keras, bucketed': lambda batch: lstm.predict_proba(batch, args.batch_size),
+    }
+    try:
+        tflite = TFLiteReviewClassifier.load(args.lstm)
+        runs['LSTM tflite, bucketed'] = lambda batch: tflite.predict_proba(batch, args.batch_size)
+    except (OSError, ValueError) as e:
+        print(f'Skipping TFLite: {e}')
+    for path in args.tfidf:
+        classifier = RestaurantReviewClassifier.load(path)
+        runs[f'TF-IDF {classifier.model}'] = lambda batch, classifier=classifier: classifier.predict_frame(batch)
+
+    print(f'{len(texts)} texts, batch size {args.batch_size}')
+    for name, run in runs.items():
+        print(f'{name:<32} {throughput(run, texts, args.repeat):10.0f} texts/s')
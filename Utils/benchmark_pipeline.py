@@ -0,0 +1,275 @@
+"""End-to-end benchmark of the review pipeline on scaled synthetic corpora.
+
+Stages, in pipeline order:
+
+* ``crawl`` - ``async_crawler.crawl`` against the in-process stub Places API
+* ``clean`` - ``clean_data_batch`` on raw review texts
+* ``augment_exp2`` - Experiment 2 synthetic comments
+* ``augment_exp3`` - Experiment 3 negative-comment injection
+* ``train`` - ``RestaurantReviewClassifier.train`` (logistic regression)
+* ``score`` - ``rating.score_places`` for every place
+
+Every stage runs at each scale (1x, 10x, 100x ``clean_data.csv`` by default)
+in a fresh process. Building the input is not timed. The suite records wall
+time, rows per second and peak RSS for each run, and optionally a cProfile
+dump and the top tracemalloc allocations. Results are written as JSON;
+``--compare`` reports the slowdown against an earlier results file::
+
+    python benchmark_pipeline.py --scales 1 10 --output ../benchmarks/pipeline.json
+    python benchmark_pipeline.py --stages train score --compare ../benchmarks/pipeline.json
+"""
+
+import argparse
+import contextlib
+import cProfile
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from dataset_loader import load
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = ['crawl', 'clean', 'augment_exp2', 'augment_exp3', 'train', 'score']
+
+
+def scaled_corpus(path, scale, seed=42):
+    """``scale`` copies of a reviews CSV; copies get new place ids and shuffled words."""
+    df = load(path)
+    rng = np.random.default_rng(seed)
+    copies = [df]
+    for k in range(1, scale):
+        copy = df.copy()
+        copy['place_id'] = copy['place_id'].astype(str) + f'_{k}'
+        copy['text'] = [text if not isinstance(text, str) else ' '.join(rng.permutation(text.split()))
+                        for text in copy['text']]
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def setup_crawl(scale, data):
+    import async_crawler  # noqa: F401 - keep imports out of the timed run
+    from stub_places_server import StubPlacesServer
+
+    server = StubPlacesServer(results_per_query=60)
+    server.start()
+    locations = {f'City_{i}': f'{50 + i * 0.05:.2f},{19 + i * 0.05:.2f}' for i in range(5 * scale)}
+    return server, locations
+
+
+def run_crawl(inputs):
+    from async_crawler import crawl
+
+    server, locations = inputs
+    places, reviews = _quiet(crawl, locations, 'benchmark', base_url=server.base_url,
+                             qps=10000, max_concurrency=32, page_token_delay=0)
+    server.shutdown()
+    return len(reviews)
+
+
+def setup_clean(scale, data):
+    from cleansed_data import english_stopwords
+
+    # Fails early, with the fix in the message, when the NLTK data is missing
+    english_stopwords()
+    return scaled_corpus(os.path.join(data, 'reviews_1.csv'), scale)['text']
+
+
+def run_clean(texts):
+    from cleansed_data import clean_data_batch
+
+    clean_data_batch(texts)
+    return len(texts)
+
+
+def setup_augment_exp2(scale, data):
+    import Experiment_2_utils  # noqa: F401
+    return len(load(os.path.join(data, 'clean_data.csv'), columns=['text'])) * scale
+
+
+def run_augment_exp2(n_rows):
+    from Experiment_2_utils import balanced_comment_counts, generate_synthetic_comments
+
+    generated = generate_synthetic_comments(balanced_comment_counts(n_rows), ['text', 'food', 'service', 'atmosphere'])
+    return len(generated)
+
+
+def setup_augment_exp3(scale, data):
+    import Experiment_3_utils  # noqa: F401
+    return scaled_corpus(os.path.join(data, 'clean_data.csv'), scale)
+
+
+def run_augment_exp3(df):
+    from augmentation import AugmentationEngine, NegativeTemplate, NullAspectInjection
+    from Experiment_3_utils import adjectives_negative
+
+    engine = AugmentationEngine([NullAspectInjection(NegativeTemplate(adjectives_negative), fraction=0.25)], seed=42)
+    return len(engine.run(df))
+
+
+def setup_train(scale, data):
+    import review_classifier  # noqa: F401
+    return scaled_corpus(os.path.join(data, 'clean_data.csv'), scale)
+
+
+def run_train(df):
+    from review_classifier import RestaurantReviewClassifier
+
+    _quiet(RestaurantReviewClassifier(model='logistic_regression').train, df)
+    return len(df)
+
+
+def setup_score(scale, data):
+    import rating  # noqa: F401
+    from review_classifier import RestaurantReviewClassifier
+
+    base = load(os.path.join(data, 'clean_data.csv'))
+    classifier = RestaurantReviewClassifier(model='logistic_regression')
+    _quiet(classifier.train, base)
+    return scaled_corpus(os.path.join(data, 'clean_data.csv'), scale), classifier
+
+
+def run_score(inputs):
+    from rating import score_places
+
+    df, classifier = inputs
+    score_places(df, classifier)
+    return len(df)
+
+
+def run_stage(stage, scale, data, profile_dir=None, trace=False):
+    """Set up and time one stage; meant to run in a fresh process."""
+    sys.path.insert(0, HERE)
+    inputs = globals()[f'setup_{stage}'](scale, data)
+    result = {'stage': stage, 'scale': scale, 'setup_rss_mb': _peak_rss_mb()}
+    run = globals()[f'run_{stage}']
+
+    profiler = cProfile.Profile() if profile_dir else None
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    rows = run(inputs)
+    if profiler:
+        profiler.disable()
+    wall = time.perf_counter() - start
+
+    result.update({'rows': rows, 'wall_s': wall, 'rows_per_s': rows / wall if wall else None,
+                   'peak_rss_mb': _peak_rss_mb()})
+    if trace:
+        # Lazy imports inside the run would otherwise dominate the listing
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ])
+        result['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        result['top_allocations'] = [
+            {'where': str(stat.traceback[0]), 'size_mb': stat.size / 2 ** 20}
+            for stat in snapshot.statistics('lineno')[:10]
+        ]
+    if profiler:
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f'{stage}-{scale}x.prof')
+        profiler.dump_stats(path)
+        result['profile'] = path
+    return result
+
+
+def _run_isolated(stage, scale, data, profile_dir, trace):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(run_stage, (stage, scale, data, profile_dir, trace))
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, previous, threshold=1.2):
+    """Print wall-time ratios against ``previous`` results; returns regressions."""
+    before = {(r['stage'], r['scale']): r for r in previous['results'] if 'wall_s' in r}
+    regressions = []
+    for result in results:
+        old = before.get((result['stage'], result['scale']))
+        if old is None or 'wall_s' not in result:
+            continue
+        ratio = result['wall_s'] / old['wall_s']
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{result['stage']:<14} {result['scale']:>4}x  {old['wall_s']:8.2f} s -> "
+              f"{result['wall_s']:8.2f} s  {ratio:5.2f}x{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--data', default=os.path.join(HERE, '..', 'raw_data'))
+    parser.add_argument('--output', default=os.path.join(HERE, '..', 'benchmarks', 'pipeline.json'))
+    parser.add_argument('--profile', metavar='DIR', help='write a cProfile dump per stage and scale')
+    parser.add_argument('--tracemalloc', action='store_true', help='record the top allocations')
+    parser.add_argument('--compare', metavar='JSON', help='earlier results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown reported as a regression')
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+
+    results = []
+    for scale in args.scales:
+        for stage in args.stages:
+            try:
+                result = _run_isolated(stage, scale, args.data, args.profile, args.tracemalloc)
+                print(f"{stage:<14} {scale:>4}x  {result['rows']:>9} rows  {result['wall_s']:8.2f} s  "
+                      f"{result['rows_per_s']:>10.0f} rows/s  {result['peak_rss_mb']:8.1f} MB")
+            except Exception as e:
+                result = {'stage': stage, 'scale': scale, 'error': f'{type(e).__name__}: {str(e).strip()}'}
+                print(f"{stage:<14} {scale:>4}x  failed: {result['error'].splitlines()[0]}")
+            results.append(result)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({**environment(), 'results': results}, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if previous is not None:
+        sys.exit(1 if compare(results, previous, args.threshold) else 0)
@@ -0,0 +1,74 @@
+"""Per-row vs columnar label decoding in RestaurantReviewClassifier.
+
+Trains a small classifier (or loads a saved artifact), then times the model
+call, the old per-row ``inverse_transform`` loop and
+``RestaurantReviewClassifier.decode_labels``, the decode of ``predict_frame``, on 10k, 100k and 1M texts. Usage::
+
+    python benchmark_predict.py --data ../raw_data/clean_data.csv
+    python benchmark_predict.py --model ../models/lr --sizes 10000 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_loader import load
+from review_classifier import ASPECTS, RestaurantReviewClassifier
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def decode_per_row(classifier, codes):
+    # The decoding loop predict() used before the columnar path
+    results = []
+    for pred in codes:
+        results.append({
+            'food': classifier.label_encoders['food'].inverse_transform([pred[0]])[0],
+            'service': classifier.label_encoders['service'].inverse_transform([pred[1]])[0],
+            'atmosphere': classifier.label_encoders['atmosphere'].inverse_transform([pred[2]])[0]
+        })
+    return results
+
+
+def texts_of_size(texts, size):
+    return np.resize(np.asarray(texts, dtype=object), size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='../raw_data/clean_data.csv')
+    parser.add_argument('--model', help='artifact directory written by RestaurantReviewClassifier.save')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--skip-per-row-above', type=int, default=1000000,
+                        help='skip the per-row loop for larger batches')
+    args = parser.parse_args()
+
+    df = load(args.data)
+    if args.model:
+        classifier = RestaurantReviewClassifier.load(args.model)
+    else:
+        classifier = RestaurantReviewClassifier(model='logistic_regression')
+        classifier.train(df)
+    texts = df['text'].dropna().astype(str).to_numpy()
+
+    print(f'{"texts":>9} {"model":>9} {"per-row":>9} {"columnar":>9} {"speed-up":>9}')
+    for size in args.sizes:
+        batch = texts_of_size(texts, size)
+        codes, model_time = timed(classifier.classifier.predict, classifier._vectorize(batch))
+
+        frame, columnar_time = timed(classifier.decode_labels, codes)
+        if size <= args.skip_per_row_above:
+            rows, per_row_time = timed(decode_per_row, classifier, codes)
+            if pd.DataFrame(rows, columns=ASPECTS).ne(frame.astype(object)).any().any():
+                raise AssertionError('columnar decoding differs from per-row decoding')
+            per_row = f'{per_row_time:8.2f}s'
+            speed_up = f'{per_row_time / columnar_time:8.0f}x'
+        else:
+            per_row = speed_up = f'{"-":>9}'
+        print(f'{size:>9} {model_time:8.2f}s {per_row} {columnar_time:8.3f}s {speed_up}')
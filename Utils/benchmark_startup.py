@@ -0,0 +1,42 @@
+"""Start-up time of the cleaning module in fresh interpreters.
+
+Measures a bare ``import cleansed_data`` (what every worker process and CLI
+call pays) and the first clean, which loads the stopwords and contractions
+lazily. Usage::
+
+    python benchmark_startup.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SNIPPETS = {
+    'import': 'import cleansed_data',
+    'import + first clean': "import cleansed_data; cleansed_data.clean_data_batch(['The food was great!'])",
+    'interpreter only': 'pass',
+}
+
+
+def time_snippet(code, runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=here, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    for name, code in SNIPPETS.items():
+        timings = time_snippet(code, args.runs)
+        print(f'{name:<22} median {statistics.median(timings):7.1f} ms  '
+              f'min {min(timings):7.1f} ms  max {max(timings):7.1f} ms')
@@ -0,0 +1,124 @@
+"""Persistent cache of cleaned review texts.
+
+Entries are keyed by a hash of the raw text and the cleaner version, so the
+same review is cleaned once no matter how many CSVs or notebooks it shows up
+in, and bumping the version invalidates everything. An in-memory LRU sits in
+front of an SQLite file::
+
+    with CleanCache('../raw_data/clean_cache.sqlite', version=CLEANER_VERSION) as cache:
+        cleaned = cache.map(texts, clean_chunk)
+        print(cache.stats())
+
+It is meant for the NLTK cleaner (``clean_data_batch(cache=...)`` and
+``cleansed_data.py --cache``). The notebooks do not use it: they read CSVs
+that are already cleaned, and their only text step,
+``term_stats.preprocess_text``, is a split and lowercase that runs faster
+than a cache lookup.
+"""
+
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+
+def text_key(text, version):
+    return hashlib.blake2b(f'{version}\x1f{text}'.encode('utf-8'), digest_size=16).digest()
+
+
+class CleanCache:
+    """LRU-fronted SQLite cache mapping raw text to cleaned text."""
+
+    def __init__(self, path, version, lru_size=100000):
+        self.path = path
+        self.version = version
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cleaned (key BLOB PRIMARY KEY, text TEXT)'
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup_disk(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay below SQLite's limit on bound parameters
+        for i in range(0, len(keys), 900):
+            batch = keys[i:i + 900]
+            query = f'SELECT key, text FROM cleaned WHERE key IN ({",".join("?" * len(batch))})'
+            found.update(self._connection.execute(query, batch).fetchall())
+        return found
+
+    def map(self, texts, clean_many):
+        """Cleaned version of every text, calling ``clean_many`` on misses only.
+
+        ``clean_many`` takes a list of raw texts and returns the cleaned list.
+        Non-string values are passed through ``clean_many`` but never cached.
+        """
+        texts = list(texts)
+        keys = [text_key(text, self.version) if isinstance(text, str) else None for text in texts]
+        results = {}
+
+        missing = set()
+        for key in keys:
+            if key is None or key in results:
+                continue
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                results[key] = self._lru[key]
+                self.memory_hits += 1
+            else:
+                missing.add(key)
+
+        on_disk = self._lookup_disk(missing)
+        self.disk_hits += len(on_disk)
+        for key, value in on_disk.items():
+            results[key] = value
+            self._remember(key, value)
+
+        to_clean = {}
+        for text, key in zip(texts, keys):
+            if key is not None and key not in results:
+                to_clean[key] = text
+        self.misses += len(to_clean)
+        if to_clean:
+            cleaned = clean_many(list(to_clean.values()))
+            new_entries = list(zip(to_clean.keys(), cleaned))
+            with self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO cleaned VALUES (?, ?)', new_entries)
+            for key, value in new_entries:
+                results[key] = value
+                self._remember(key, value)
+
+        passthrough = [text for text, key in zip(texts, keys) if key is None]
+        passthrough = iter(clean_many(passthrough)) if passthrough else iter(())
+        return [results[key] if key is not None else next(passthrough) for key in keys]
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'lookups': lookups,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
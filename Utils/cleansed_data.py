@@ -7,38 +7,277 @@ Original file is located at
     https://colab.research.google.com/drive/1KFN6VtDwkninXlQSoVKpa6wDgUczm4r9
 """
 
-# !pip install emoji
-#
 # !pip install contractions
 
-import pandas as pd
+import functools
+import os
 import re
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import nltk
-import emoji
-import contractions
+import sys
+
+# NLTK data is looked up here first. Fill it once with
+# `python cleansed_data.py --download-resources`; after that cleaning runs
+# offline. The directory is git-ignored. Nothing is downloaded or loaded at
+# import time.
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+NLTK_RESOURCES = ['punkt', 'punkt_tab', 'stopwords']
+
+
+def _nltk():
+  import nltk
+  if NLTK_DATA_DIR not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_DIR)
+  return nltk
+
+
+def _missing_resource(resource):
+  return LookupError(f'NLTK resource {resource!r} not found. Run `python cleansed_data.py '
+                     f'--download-resources` once (needs network access) to fill {NLTK_DATA_DIR}.')
+
+
+def download_resources(download_dir=NLTK_DATA_DIR):
+  """Fetch the NLTK resources used here into the local resource path."""
+  nltk = _nltk()
+  for resource in NLTK_RESOURCES:
+    nltk.download(resource, download_dir=download_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def english_stopwords():
+  """NLTK's English stopword list, read once on first use."""
+  vendored = os.path.join(NLTK_DATA_DIR, 'corpora', 'stopwords', 'english')
+  if os.path.exists(vendored):
+    # Plain word-per-line file; no need to import NLTK for it
+    with open(vendored, encoding='utf-8') as f:
+      return frozenset(line.strip() for line in f if line.strip())
+  from nltk.corpus import stopwords
+  _nltk()
+  try:
+    return frozenset(stopwords.words('english'))
+  except LookupError:
+    raise _missing_resource('stopwords') from None
+
+
+def word_tokenize(text):
+  _nltk()
+  from nltk.tokenize import word_tokenize as nltk_word_tokenize
+  try:
+    return nltk_word_tokenize(text)
+  except LookupError:
+    raise _missing_resource('punkt_tab') from None
+
+
+def fix_contractions(text):
+  import contractions
+  return contractions.fix(text)
+
+
+def _like_input(texts, cleaned):
+  """Return ``cleaned`` as a Series if ``texts`` was one."""
+  # pandas is only loaded by callers that already work with DataFrames
+  pd = sys.modules.get('pandas')
+  if pd is not None and isinstance(texts, pd.Series):
+    return pd.Series(cleaned, index=texts.index, name=texts.name, dtype=object)
+  return cleaned
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('punkt_tab')
 
 def clean_data(data):
   if isinstance(data,str):
-    data = contractions.fix(data)
+    data = fix_contractions(data)
     data = re.sub(r'[^a-zA-Z\s]','',data)
     data = data.lower().strip()
     tokens = word_tokenize(data)
-    stop_words = set(stopwords.words('english'))
+    stop_words = english_stopwords()
     tokens = [word for word in tokens if word not in stop_words]
 
     cleaned_data = ' '.join(tokens)
     return cleaned_data
 
-data = pd.read_csv("reviews_1.csv")
-df = pd.DataFrame(data)
-df.head()
 
-df['text'] = df['text'].apply(clean_data)
+# Bump whenever the cleaning output changes; it invalidates cached results
+CLEANER_VERSION = 'clean_data-1'
+
+NON_LETTERS = re.compile(r'[^a-zA-Z\s]')
+
+# Once only letters and whitespace are left, word_tokenize() does nothing
+# but str.split() plus splitting these words (NLTK's MacIntyre contractions)
+TOKENIZER_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+
+class BatchCleaner:
+  """clean_data() for many texts, with the stopword set and regexes built once.
+
+  Output is identical to clean_data(). Every distinct token is split and
+  stopword-filtered only once, and repeated texts within a chunk are cleaned
+  only once.
+  """
+
+  def __init__(self):
+    self.stop_words = english_stopwords()
+    self._kept_tokens = {}
+
+  def _keep(self, token):
+    kept = self._kept_tokens.get(token)
+    if kept is None:
+      parts = TOKENIZER_SPLITS.get(token, (token,))
+      kept = tuple(part for part in parts if part not in self.stop_words)
+      self._kept_tokens[token] = kept
+    return kept
+
+  def clean(self, data):
+    if not isinstance(data, str):
+      return None
+    data = NON_LETTERS.sub('', fix_contractions(data)).lower()
+    return ' '.join(word for token in data.split() for word in self._keep(token))
+
+  def clean_chunk(self, texts):
+    unique = {text: None for text in texts if isinstance(text, str)}
+    for text in unique:
+      unique[text] = self.clean(text)
+    return [unique[text] if isinstance(text, str) else None for text in texts]
+
+
+_worker_cleaner = None
+
+
+def _clean_chunk_in_worker(texts):
+  global _worker_cleaner
+  if _worker_cleaner is None:
+    _worker_cleaner = BatchCleaner()
+  return _worker_cleaner.clean_chunk(texts)
+
+
+def clean_data_batch(texts, chunk_size=2000, n_jobs=1, executor=None, cache=None):
+  """Vectorised ``texts.apply(clean_data)``.
+
+  ``texts`` is a Series or any sequence; a Series keeps its index. With
+  ``n_jobs`` > 1 (or -1 for all cores) the chunks are cleaned in a process
+  pool; pass ``executor`` to reuse a pool across calls. With a
+  ``clean_cache.CleanCache`` only texts missing from the cache are cleaned.
+  """
+  if cache is not None:
+    cleaned = cache.map(texts, lambda values: clean_data_batch(values, chunk_size, n_jobs, executor))
+    return _like_input(texts, cleaned)
+
+  values = list(texts)
+  chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+  if n_jobs == -1:
+    n_jobs = os.cpu_count()
+
+  if executor is not None:
+    cleaned_chunks = list(executor.map(_clean_chunk_in_worker, chunks))
+  elif n_jobs > 1 and len(chunks) > 1:
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+      cleaned_chunks = list(executor.map(_clean_chunk_in_worker, chunks))
+  else:
+    cleaned_chunks = [_clean_chunk_in_worker(chunk) for chunk in chunks]
+
+  cleaned = [text for chunk in cleaned_chunks for text in chunk]
+  return _like_input(texts, cleaned)
+
+
+def iter_clean_records(records, text_column='text', chunk_size=2000):
+  """Generator cleaning ``text_column`` of a stream of dict records.
+
+  Only ``chunk_size`` records are held at a time.
+  """
+  chunk = []
+  for record in records:
+    chunk.append(record)
+    if len(chunk) == chunk_size:
+      yield from _clean_records(chunk, text_column)
+      chunk = []
+  if chunk:
+    yield from _clean_records(chunk, text_column)
+
+
+def _clean_records(chunk, text_column):
+  cleaned = _clean_chunk_in_worker([record.get(text_column) for record in chunk])
+  for record, text in zip(chunk, cleaned):
+    yield {**record, text_column: text}
+
+
+def _read_chunks(input_path, chunk_size):
+  """DataFrames of at most ``chunk_size`` rows from a CSV or a Parquet store."""
+  if os.path.isdir(input_path):
+    # Reviews table of the crawler's columnar store (see columnar_store.py)
+    from columnar_store import dataset
+    reviews = dataset(input_path, 'reviews')
+    if reviews is None:
+      return
+    for batch in reviews.to_batches(batch_size=chunk_size):
+      if batch.num_rows:
+        yield batch.to_pandas()
+  else:
+    import pandas as pd
+    # Read every column as text: per-chunk type inference would otherwise
+    # write the same column differently from one chunk to the next
+    yield from pd.read_csv(input_path, chunksize=chunk_size, dtype=str)
+
+
+def clean_file(input_path, output_path, chunk_size=10000, n_jobs=1, text_column='text', cache_path=None):
+  """Stream ``input_path`` through the cleaner into the ``output_path`` CSV.
+
+  Memory use is bounded by ``chunk_size`` whatever the input size. With
+  ``cache_path`` cleaned texts are cached in that SQLite file. Returns the
+  number of rows written.
+  """
+  from concurrent.futures import ProcessPoolExecutor
+  from clean_cache import CleanCache
+
+  if n_jobs == -1:
+    n_jobs = os.cpu_count()
+  executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+  cache = CleanCache(cache_path, CLEANER_VERSION) if cache_path else None
+  tmp_path = output_path + '.tmp'
+  rows = 0
+  try:
+    for i, chunk in enumerate(_read_chunks(input_path, chunk_size)):
+      chunk[text_column] = clean_data_batch(chunk[text_column], chunk_size=max(1, chunk_size // max(1, n_jobs)),
+                                            executor=executor, cache=cache)
+      chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+      rows += len(chunk)
+  finally:
+    if executor is not None:
+      executor.shutdown()
+    if cache is not None:
+      print('Clean cache:', cache.stats())
+      cache.close()
+  if rows:
+    os.replace(tmp_path, output_path)
+  return rows
+
+
+if __name__ == '__main__':
+  import argparse
+
+  parser = argparse.ArgumentParser(description='Clean review texts chunk by chunk.')
+  parser.add_argument('input', nargs='?', help='reviews CSV, or the directory of a Parquet store')
+  parser.add_argument('output', nargs='?', help='cleaned CSV to write')
+  parser.add_argument('--download-resources', action='store_true',
+                      help=f'fetch the NLTK data into {NLTK_DATA_DIR} and exit')
+  parser.add_argument('--chunk-size', type=int, default=10000)
+  parser.add_argument('--n-jobs', type=int, default=1, help='worker processes, -1 for all cores')
+  parser.add_argument('--text-column', default='text')
+  parser.add_argument('--cache', help='SQLite file caching cleaned texts between runs')
+  args = parser.parse_args()
+
+  if args.download_resources:
+    download_resources()
+    sys.exit()
+  if args.output is None:
+    parser.error('input and output are required')
+  try:
+    english_stopwords()
+  except LookupError as error:
+    sys.exit(str(error))
 
-df.to_csv('cleansed_reviews.csv',index=False)
\ No newline at end of file
+  rows = clean_file(args.input, args.output, args.chunk_size, args.n_jobs, args.text_column, args.cache)
+  print(f'Cleaned {rows} rows into {args.output}')
@@ -0,0 +1,224 @@
+"""Append-only Parquet storage for crawled places and reviews.
+
+Records are buffered into typed column batches and written as new Parquet
+files, partitioned by crawl date and city::
+
+    store/reviews/crawl_date=2024-10-23/city=Warszawa/part-000012.parquet
+
+Nothing is ever rewritten, so adding a batch costs only the batch itself.
+Readers load just the columns they ask for::
+
+    reviews = read_table('../raw_data/store', 'reviews', columns=['place_id', 'rating', 'text'])
+"""
+
+import datetime
+import glob
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from async_crawler import unique_places_headers
+from crawl_state import review_key
+
+# Nested API values (lists, dicts) are kept as their str() like in the CSVs
+PLACES_TYPES = {
+    'rating': pa.float64(),
+    'user_ratings_total': pa.int64(),
+    'price_level': pa.int64(),
+    'geometry.location.lng': pa.float64(),
+    'geometry.location.lat': pa.float64(),
+}
+PLACES_SCHEMA = pa.schema([(header, PLACES_TYPES.get(header, pa.string()))
+                           for header in unique_places_headers])
+
+REVIEWS_SCHEMA = pa.schema([
+    ('place_id', pa.string()),
+    ('author_name', pa.string()),
+    ('language', pa.string()),
+    ('original_language', pa.string()),
+    ('rating', pa.int64()),
+    ('relative_time_description', pa.string()),
+    ('text', pa.string()),
+    ('time', pa.int64()),
+    ('translated', pa.bool_()),
+])
+
+SCHEMAS = {'places': PLACES_SCHEMA, 'reviews': REVIEWS_SCHEMA}
+
+PART_PATTERN = re.compile(r'part-(\d+)\.parquet$')
+
+
+def city_name(location_key):
+    """'Warszawa_3' or 'Warszawa_u3qcnh' (a tile) -> 'Warszawa'."""
+    if location_key is None:
+        return 'unknown'
+    return re.sub(r'_[0-9a-z]+$', '', location_key)
+
+
+def _to_column(values, field):
+    """Coerce one buffered column to the field's type."""
+    if pa.types.is_string(field.type):
+        # v != v catches the NaN pandas uses for missing values
+        values = [None if v is None or v != v else str(v) for v in values]
+    return pa.array(values, type=field.type, from_pandas=True)
+
+
+class ColumnBatch:
+    """Row buffer kept as one Python list per column."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.columns = {name: [] for name in schema.names}
+        self.num_rows = 0
+
+    def append(self, row):
+        for name, value in zip(self.schema.names, row):
+            self.columns[name].append(value)
+        self.num_rows += 1
+
+    def to_table(self):
+        return pa.Table.from_arrays(
+            [_to_column(self.columns[field.name], field) for field in self.schema],
+            schema=self.schema
+        )
+
+
+class ParquetSink:
+    """Crawler sink writing one Parquet file per table and partition per flush.
+
+    Part files carry a store-wide sequence number; a checkpoint only stores
+    the last one, and rolling back deletes every newer part. Numbers are
+    never reused, even after a rollback, because readers such as
+    ``rating_service.StoreReviewSource`` only look for parts above the last
+    number they have seen. The highest number handed out is kept in
+    ``<root>/_sequence``.
+    """
+
+    kind = 'parquet'
+
+    def __init__(self, root, crawl_date=None, compression='zstd'):
+        self.root = root
+        self.crawl_date = crawl_date or datetime.date.today().isoformat()
+        self.compression = compression
+        self.sequence_path = os.path.join(root, '_sequence')
+        self.sequence = max([self._part_number(path) for path in self._parts()] + [self._read_sequence()])
+
+    def _parts(self, pattern='part-*.parquet'):
+        return glob.glob(os.path.join(self.root, '*', '*', '*', pattern))
+
+    def _read_sequence(self):
+        if not os.path.exists(self.sequence_path):
+            return 0
+        with open(self.sequence_path, encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+
+    def _next_sequence(self):
+        """Reserve the next part number before its file is written."""
+        self.sequence += 1
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.sequence_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(self.sequence))
+        os.replace(tmp_path, self.sequence_path)
+        return self.sequence
+
+    @staticmethod
+    def _part_number(path):
+        return int(PART_PATTERN.search(path).group(1))
+
+    def _write_partition(self, table, city, batch):
+        directory = os.path.join(self.root, table, f'crawl_date={self.crawl_date}', f'city={city}')
+        os.makedirs(directory, exist_ok=True)
+        name = f'part-{self._next_sequence():06d}.parquet'
+        path = os.path.join(directory, name)
+        # Hidden from the dataset readers (they skip '.' and '_' prefixes) until complete
+        tmp_path = os.path.join(directory, f'.{name}.tmp')
+        pq.write_table(batch.to_table(), tmp_path, compression=self.compression)
+        os.replace(tmp_path, path)
+
+    def write(self, records):
+        """Append ``(location_key, place_row, review_rows)`` records."""
+        batches = {}
+        for location_key, place_row, review_rows in records:
+            city = city_name(location_key)
+            if city not in batches:
+                batches[city] = {table: ColumnBatch(schema) for table, schema in SCHEMAS.items()}
+            batches[city]['places'].append(place_row)
+            for row in review_rows:
+                batches[city]['reviews'].append(row)
+
+        for city, tables in batches.items():
+            for table, batch in tables.items():
+                if batch.num_rows:
+                    self._write_partition(table, city, batch)
+
+    def position(self):
+        return {'sequence': self.sequence}
+
+    def rollback(self, position):
+        """Delete the parts written after ``position`` and any unfinished part."""
+        for path in self._parts():
+            if self._part_number(path) > position['sequence']:
+                os.remove(path)
+        for path in self._parts('.part-*.parquet.tmp'):
+            os.remove(path)
+
+    def existing_place_ids(self):
+        table = read_table(self.root, 'places', columns=['place_id'], as_pandas=False)
+        return [] if table is None else table.column('place_id').to_pylist()
+
+    def existing_review_keys(self):
+        table = read_table(self.root, 'reviews', columns=['place_id', 'author_name', 'time'], as_pandas=False)
+        if table is None:
+            return []
+        return [review_key(*key) for key in zip(*(table.column(c).to_pylist() for c in table.column_names))]
+
+
+def dataset(root, table):
+    """Arrow dataset over all partitions of ``table``, or None if empty."""
+    path = os.path.join(root, table)
+    if not glob.glob(os.path.join(path, '*', '*', 'part-*.parquet')):
+        return None
+    return ds.dataset(path, format='parquet', partitioning='hive', schema=_with_partitions(SCHEMAS[table]))
+
+
+def _with_partitions(schema):
+    return schema.append(pa.field('crawl_date', pa.string())).append(pa.field('city', pa.string()))
+
+
+def read_table(root, table, columns=None, filter=None, as_pandas=True):
+    """Read selected ``columns`` of ``table`` (optionally an Arrow ``filter``).
+
+    Example: ``read_table(root, 'reviews', ['text'], ds.field('city') == 'Kraków')``.
+    """
+    data = dataset(root, table)
+    if data is None:
+        return None
+    result = data.to_table(columns=columns, filter=filter)
+    return result.to_pandas() if as_pandas else result
+
+
+def import_csv(csv_path, root, table, crawl_date='unknown', city='unknown', chunk_size=50000):
+    """One-off import of an existing places/reviews CSV into the store.
+
+    Review times may be Unix seconds or date strings (as in the sampled
+    CSVs); both are stored as Unix seconds.
+    """
+    import pandas as pd
+    from dataset_loader import _to_boolean, _to_datetime
+
+    schema = SCHEMAS[table]
+    sink = ParquetSink(root, crawl_date)
+    for chunk in pd.read_csv(csv_path, usecols=lambda c: c in schema.names, chunksize=chunk_size):
+        if 'translated' in chunk:
+            chunk['translated'] = _to_boolean(chunk['translated'])
+        if table == 'reviews' and 'time' in chunk:
+            chunk['time'] = ((_to_datetime(chunk['time']) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).astype('Int64')
+        batch = ColumnBatch(schema)
+        for name in schema.names:
+            batch.columns[name] = chunk[name].tolist() if name in chunk else [None] * len(chunk)
+        batch.num_rows = len(chunk)
+        sink._write_partition(table, city, batch)
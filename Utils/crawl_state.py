@@ -0,0 +1,248 @@
+"""Persistent, resumable state for the Places crawler.
+
+``CrawlState`` keeps a hashed index of the place ids and review keys
+(place_id, author_name, time) already stored, plus a cursor per city and
+result page. Results are buffered and written to a sink in batches; each flush
+ends with an atomic checkpoint, so a crash never costs more than the batch
+that was being collected. On restart the sink is rolled back to the last
+checkpoint, completed cities are skipped and places whose details request
+failed are requested again.
+"""
+
+import csv
+import hashlib
+import json
+import os
+
+from async_crawler import review_headers, unique_places_headers
+
+
+def review_key(place_id, author_name, time):
+    """Short stable hash identifying one review."""
+    raw = f'{place_id}\x1f{author_name}\x1f{time}'.encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+class CsvSink:
+    """Appends place and review rows to the existing CSV files.
+
+    Rows are aligned to the header already present in each file, so extra
+    annotation columns (food, service, ...) are left empty for new reviews.
+    """
+
+    kind = 'csv'
+
+    def __init__(self, places_path, reviews_path):
+        self.paths = {'places': places_path, 'reviews': reviews_path}
+        self.headers = {'places': unique_places_headers, 'reviews': review_headers}
+
+    def _read_header(self, name):
+        path = self.paths[name]
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, newline='', encoding='utf-8') as f:
+            return next(csv.reader(f))
+
+    def _ends_with_newline(self, name):
+        with open(self.paths[name], 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b'\n', b'\r')
+
+    def _append(self, name, rows):
+        if not rows:
+            return
+        header = self._read_header(name)
+        new_file = header is None
+        header = header or self.headers[name]
+        needs_newline = not new_file and not self._ends_with_newline(name)
+        with open(self.paths[name], 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=header, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            elif needs_newline:
+                f.write('\r\n')
+            for row in rows:
+                writer.writerow(dict(zip(self.headers[name], row)))
+
+    def write(self, records):
+        """Append ``(city, place_row, review_rows)`` records."""
+        self._append('places', [place_row for _, place_row, _ in records])
+        self._append('reviews', [row for _, _, review_rows in records for row in review_rows])
+
+    def position(self):
+        """Current size of every file, stored in the checkpoint."""
+        return {name: os.path.getsize(path) if os.path.exists(path) else 0
+                for name, path in self.paths.items()}
+
+    def rollback(self, position):
+        """Drop anything written after ``position`` (an interrupted flush)."""
+        for name, path in self.paths.items():
+            if name in position and os.path.exists(path) and os.path.getsize(path) > position[name]:
+                with open(path, 'r+b') as f:
+                    f.truncate(position[name])
+
+    def existing_place_ids(self):
+        path = self.paths['places']
+        if self._read_header('places') is None:
+            return []
+        with open(path, newline='', encoding='utf-8') as f:
+            return [row['place_id'] for row in csv.DictReader(f) if row.get('place_id')]
+
+    def existing_review_keys(self):
+        path = self.paths['reviews']
+        if self._read_header('reviews') is None:
+            return []
+        with open(path, newline='', encoding='utf-8') as f:
+            return [review_key(row.get('place_id'), row.get('author_name'), row.get('time'))
+                    for row in csv.DictReader(f)]
+
+
+class CrawlState:
+    """Seen-set index, page cursors and batched output of one crawl.
+
+    ``directory`` holds ``checkpoint.json`` plus two append-only index files
+    (``places.idx`` and ``reviews.idx``) with one hash per line.
+    """
+
+    def __init__(self, directory, sink, batch_size=50):
+        self.directory = directory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.checkpoint_path = os.path.join(directory, 'checkpoint.json')
+        self.index_paths = {'places': os.path.join(directory, 'places.idx'),
+                            'reviews': os.path.join(directory, 'reviews.idx')}
+
+        self.seen_places = set()
+        self.seen_reviews = set()
+        self._in_flight = set()
+        self.cursors = {}
+        self.failed_places = {}
+
+        self._pending_records = []
+        self._pending_place_ids = []
+        self._pending_review_keys = []
+        self._pending_cursors = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.checkpoint_path):
+            # First run: seed the index from whatever the sink already holds
+            self.seen_places.update(self.sink.existing_place_ids())
+            self.seen_reviews.update(self.sink.existing_review_keys())
+            for name, keys in (('places', self.seen_places), ('reviews', self.seen_reviews)):
+                with open(self.index_paths[name], 'w', encoding='utf-8') as f:
+                    f.writelines(f'{key}\n' for key in keys)
+            self._write_checkpoint()
+            return
+
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        # Checkpoints written before sink_kind was stored tell the sinks apart by their position
+        sink_kind = checkpoint.get('sink_kind') or ('parquet' if 'sequence' in checkpoint['sink'] else 'csv')
+        if sink_kind != self.sink.kind:
+            raise ValueError(f'{self.checkpoint_path} belongs to a {sink_kind} sink, not {self.sink.kind}; '
+                             f'keep the output format or use a new state directory')
+        self.cursors = checkpoint['cursors']
+        self.sink.rollback(checkpoint['sink'])
+        for name, target in (('places', self.seen_places), ('reviews', self.seen_reviews)):
+            path = self.index_paths[name]
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(checkpoint['index'][name])
+                with open(path, encoding='utf-8') as f:
+                    target.update(line.rstrip('\n') for line in f if line.strip())
+        self.failed_places = {place_id: city for place_id, city in checkpoint.get('failed_places', {}).items()
+                              if place_id not in self.seen_places}
+
+    def _write_checkpoint(self):
+        checkpoint = {
+            'cursors': self.cursors,
+            'failed_places': self.failed_places,
+            'sink_kind': self.sink.kind,
+            'sink': self.sink.position(),
+            'index': {name: os.path.getsize(path) if os.path.exists(path) else 0
+                      for name, path in self.index_paths.items()},
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def is_known(self, place_id):
+        return place_id in self.seen_places or place_id in self._in_flight
+
+    def claim(self, place_id):
+        """Reserve ``place_id`` for crawling; returns False if already taken."""
+        if self.is_known(place_id):
+            return False
+        self._in_flight.add(place_id)
+        return True
+
+    def release(self, place_id):
+        """Give up a claimed place (e.g. it has no details)."""
+        self._in_flight.discard(place_id)
+
+    def fail(self, place_id, city=None):
+        """Give up a claimed place whose details request failed.
+
+        The place is kept in the checkpoint until a later run crawls it, even
+        if the page that listed it is already complete.
+        """
+        self._in_flight.discard(place_id)
+        self.failed_places[place_id] = city
+
+    def add_place(self, place_id, place_row, review_rows, city=None):
+        """Buffer a crawled place and its not yet stored reviews."""
+        self._in_flight.discard(place_id)
+        self.failed_places.pop(place_id, None)
+        self.seen_places.add(place_id)
+        self._pending_place_ids.append(place_id)
+        new_reviews = []
+        for row in review_rows:
+            key = review_key(row[0], row[1], row[7])
+            if key not in self.seen_reviews:
+                self.seen_reviews.add(key)
+                self._pending_review_keys.append(key)
+                new_reviews.append(row)
+        self._pending_records.append((city, place_row, new_reviews))
+
+    def cursor(self, city):
+        return self.cursors.get(city, {'page': 0, 'next_page_token': None, 'done': False})
+
+    def is_city_done(self, city):
+        return self.cursor(city)['done']
+
+    def complete_page(self, city, page, next_page_token=None):
+        """Record that ``page`` of ``city`` and all of its places are buffered.
+
+        The cursor only becomes durable together with the batch holding the
+        page's places.
+        """
+        self._pending_cursors[city] = {'page': page + 1,
+                                       'next_page_token': next_page_token,
+                                       'done': next_page_token is None}
+        if len(self._pending_records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows, extend the index and checkpoint atomically."""
+        self.sink.write(self._pending_records)
+        for name, keys in (('places', self._pending_place_ids), ('reviews', self._pending_review_keys)):
+            with open(self.index_paths[name], 'a', encoding='utf-8') as f:
+                f.writelines(f'{key}\n' for key in keys)
+        self.cursors.update(self._pending_cursors)
+        self._write_checkpoint()
+
+        self._pending_records = []
+        self._pending_place_ids = []
+        self._pending_review_keys = []
+        self._pending_cursors = {}
+
+    def reset_cursors(self):
+        """Forget page cursors to crawl every city again on the next run."""
+        self.cursors = {}
+        self._write_checkpoint()
@@ -0,0 +1,195 @@
+"""Typed loading of the raw_data CSVs with a Parquet cache next to each file.
+
+``pd.read_csv`` with default dtypes stores every id, language code and label
+as a separate Python string, leaves the ``FAŁSZ``/``PRAWDA`` flags as text,
+and keeps ``time`` as raw epoch seconds. ``load`` applies one schema per
+kind of file:
+
+* ids, language codes and other low-cardinality columns -> ``category``
+* ``food`` / ``service`` / ``atmosphere`` -> ``ASPECT_DTYPE`` (None/Positive/Negative)
+* free text (``text``, ``author_name``, addresses) -> Arrow-backed strings
+* ``rating`` -> nullable ``Int8`` (reviews), counts -> nullable ints
+* ``translated`` / ``to_be_removed`` -> nullable ``boolean``
+* ``time`` -> ``datetime64``, from epoch seconds or ISO timestamps
+
+The first load writes the typed frame to ``<name>.typed.parquet`` beside the
+CSV. Later loads read only the requested columns from it. The cache is
+rebuilt when the CSV is newer or ``SCHEMA_VERSION`` changes::
+
+    reviews = load('../raw_data/clean_data.csv', columns=['text', 'food', 'service', 'atmosphere'])
+    save_csv(reviews, '../raw_data/filtered_data.csv')   # times back to epoch seconds
+    python dataset_loader.py ../raw_data/*.csv     # build the caches and compare with read_csv
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SCHEMA_VERSION = 1
+
+ASPECT_DTYPE = pd.CategoricalDtype(['None', 'Positive', 'Negative'])
+
+STRING_DTYPE = pd.StringDtype('pyarrow')
+
+REVIEWS_SCHEMA = {
+    'place_id': 'category',
+    'author_name': STRING_DTYPE,
+    'language': 'category',
+    'original_language': 'category',
+    'rating': 'Int8',
+    'relative_time_description': 'category',
+    'text': STRING_DTYPE,
+    'time': 'datetime',
+    'translated': 'boolean',
+    'food': ASPECT_DTYPE,
+    'service': ASPECT_DTYPE,
+    'atmosphere': ASPECT_DTYPE,
+    'to_be_removed': 'boolean',
+}
+
+PLACES_SCHEMA = {
+    'place_id': 'category',
+    'permanently_closed': 'boolean',
+    'rating': 'Float32',
+    'wheelchair_accessible': 'boolean',
+    'user_ratings_total': 'Int32',
+    'price_level': 'Int8',
+    'geometry.location.lng': 'float64',
+    'geometry.location.lat': 'float64',
+    'scope': 'category',
+    'business_status': 'category',
+}
+
+SCHEMAS = {'reviews': REVIEWS_SCHEMA, 'places': PLACES_SCHEMA}
+
+# Both spellings of the flags occur: Polish spreadsheet exports and pandas'
+TRUE_VALUES = {'PRAWDA', 'TRUE', 'True', 'true', '1', '1.0'}
+FALSE_VALUES = {'FAŁSZ', 'FALSE', 'False', 'false', '0', '0.0'}
+
+
+def detect_schema(columns):
+    """'places' for the place details CSVs, otherwise 'reviews'."""
+    return 'places' if 'user_ratings_total' in columns or 'vicinity' in columns else 'reviews'
+
+
+def _to_boolean(values):
+    text = values.astype('string')
+    result = pd.Series(pd.NA, index=values.index, dtype='boolean')
+    result[text.isin(TRUE_VALUES).fillna(False)] = True
+    result[text.isin(FALSE_VALUES).fillna(False)] = False
+    return result
+
+
+def _to_datetime(values):
+    numeric = pd.to_numeric(values, errors='coerce')
+    if numeric.notna().sum() == values.notna().sum():
+        return pd.to_datetime(numeric, unit='s')
+    return pd.to_datetime(values, format='ISO8601', errors='coerce')
+
+
+def _to_categories(name, values, dtype):
+    # astype() would turn a value outside the categories into NaN, i.e. 'None'
+    unknown = values.notna() & ~values.isin(dtype.categories)
+    if unknown.any():
+        raise ValueError(f'Unexpected {name} values {sorted(set(values[unknown]))}, '
+                         f'expected {list(dtype.categories)}.')
+    return values.astype(dtype)
+
+
+def apply_schema(df, schema):
+    """Cast the columns of ``df`` named in ``schema``; other columns become Arrow strings.
+
+    Raises ValueError for values outside a column's fixed categories (the
+    aspect labels).
+    """
+    columns = {}
+    for name, values in df.items():
+        dtype = schema.get(name, STRING_DTYPE)
+        if isinstance(dtype, pd.CategoricalDtype) and dtype.categories is not None:
+            columns[name] = _to_categories(name, values, dtype)
+        elif dtype == 'boolean':
+            columns[name] = _to_boolean(values)
+        elif dtype == 'datetime':
+            columns[name] = _to_datetime(values)
+        elif dtype in ('Int8', 'Int32', 'Int64', 'Float32', 'float64'):
+            columns[name] = pd.to_numeric(values, errors='coerce').astype(dtype)
+        else:
+            columns[name] = values.astype(dtype)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def cache_path(path):
+    return os.path.splitext(path)[0] + '.typed.parquet'
+
+
+def _cache_is_fresh(path, cached):
+    if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(path):
+        return False
+    metadata = pq.read_schema(cached).metadata or {}
+    return metadata.get(b'schema_version') == str(SCHEMA_VERSION).encode()
+
+
+def write_cache(df, cached):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b'schema_version': str(SCHEMA_VERSION).encode()})
+    tmp = cached + '.tmp'
+    pq.write_table(table, tmp)
+    os.replace(tmp, cached)
+
+
+def load(path, columns=None, schema=None, cache=True):
+    """Typed DataFrame of a raw_data CSV, optionally only ``columns``.
+
+    ``schema`` is 'reviews', 'places' or a ``{column: dtype}`` dict and is
+    detected from the header by default. With ``cache`` the typed table is
+    kept in ``cache_path(path)``.
+    """
+    cached = cache_path(path)
+    if cache and _cache_is_fresh(path, cached):
+        if columns is not None:
+            available = set(pq.read_schema(cached).names)
+            missing = [column for column in columns if column not in available]
+            if missing:
+                raise KeyError(f'{path} has no columns {missing}')
+        return pq.read_table(cached, columns=columns).to_pandas()
+
+    df = pd.read_csv(path, dtype=str, usecols=None if cache else columns)
+    if schema is None:
+        schema = detect_schema(df.columns)
+    df = apply_schema(df, SCHEMAS[schema] if isinstance(schema, str) else schema)
+    if cache:
+        write_cache(df, cached)
+    return df if columns is None else df[list(columns)]
+
+
+def save_csv(df, path):
+    """Write a loaded frame back in the raw_data CSV format (``time`` as epoch seconds)."""
+    df = df.copy()
+    for name, values in df.items():
+        if pd.api.types.is_datetime64_any_dtype(values):
+            df[name] = (values - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    df.to_csv(path, index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the typed caches and compare them with read_csv.')
+    parser.add_argument('paths', nargs='+', help='raw_data CSV files')
+    parser.add_argument('--columns', nargs='+', help='only load these columns')
+    args = parser.parse_args()
+
+    print(f'{"file":<28} {"read_csv":>10} {"MB":>7} {"load":>10} {"MB":>7}')
+    for path in args.paths:
+        start = time.perf_counter()
+        plain = pd.read_csv(path, usecols=args.columns)
+        plain_seconds = time.perf_counter() - start
+        load(path)  # make sure the cache exists
+        start = time.perf_counter()
+        typed = load(path, columns=args.columns)
+        typed_seconds = time.perf_counter() - start
+        print(f'{os.path.basename(path):<28} {plain_seconds * 1000:8.1f}ms '
+              f'{plain.memory_usage(deep=True).sum() / 2 ** 20:7.2f} '
+              f'{typed_seconds * 1000:8.1f}ms {typed.memory_usage(deep=True).sum() / 2 ** 20:7.2f}')
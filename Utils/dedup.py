@@ -0,0 +1,174 @@
+"""Near-duplicate review detection with MinHash and locality-sensitive hashing.
+
+The corpora contain many near-identical texts. Repeated crawls re-fetch the
+same Google reviews, Experiment 2 generates template-like comments, and
+Experiment 3 appends one of a few fixed templates to real reviews.
+Duplicates inflate training time and let a single review count several
+times in a place's rating.
+
+``MinHashLSH`` finds every pair of reviews whose word-shingle Jaccard
+similarity is at least ``threshold`` without comparing all pairs:
+
+1. each review becomes a set of ``shingle_size``-word shingles and a MinHash
+   signature of ``num_perm`` values;
+2. the signatures are cut into bands, and reviews that share any band
+   become candidate pairs;
+3. candidates whose signatures agree on at least ``threshold`` of their
+   values are joined, and connected components are the duplicate clusters.
+
+Run time is linear in the number of reviews plus the number of candidate
+pairs. ``deduplicate`` keeps the first review of each cluster::
+
+    df = deduplicate(load('../raw_data/reviews.csv'), threshold=0.8, by='place_id')
+    python dedup.py ../raw_data/*.csv --threshold 0.8
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from sklearn.utils import murmurhash3_32
+
+from dataset_loader import load
+from term_stats import preprocess_text
+
+# Mersenne prime for the MinHash permutations
+_PRIME = np.uint64(2 ** 31 - 1)
+
+
+def lsh_params(threshold, num_perm):
+    """``(bands, rows)`` whose S-curve ``(1 / bands) ** (1 / rows)`` is closest to ``threshold``."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashLSH:
+    """Clusters of texts whose shingle Jaccard similarity is at least ``threshold``.
+
+    Texts with no words after preprocessing (e.g. star-only reviews) are
+    never treated as duplicates.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=3, seed=1, batch_size=1000):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.batch_size = batch_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm).astype(np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm).astype(np.uint64)
+
+    def shingles(self, text):
+        words = preprocess_text(text).split() if isinstance(text, str) else []
+        if len(words) <= self.shingle_size:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signatures(self, texts):
+        """``(n, num_perm)`` MinHash signatures; rows of texts without shingles stay at the maximum."""
+        texts = list(texts)
+        signatures = np.full((len(texts), self.num_perm), _PRIME, dtype=np.uint64)
+        for start in range(0, len(texts), self.batch_size):
+            hashes = [np.fromiter((murmurhash3_32(shingle, seed=self.seed, positive=True)
+                                   for shingle in self.shingles(text)), dtype=np.uint64)
+                      for text in texts[start:start + self.batch_size]]
+            lengths = np.array([len(h) for h in hashes])
+            rows = start + np.flatnonzero(lengths)
+            if not len(rows):
+                continue
+            flat = np.concatenate(hashes) % _PRIME
+            permuted = (self._a[:, None] * flat + self._b[:, None]) % _PRIME
+            offsets = np.concatenate([[0], np.cumsum(lengths[lengths > 0])[:-1]])
+            signatures[rows] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return signatures
+
+    def candidate_pairs(self, signatures):
+        """Pairs sharing at least one band; each bucket links its members to its first review."""
+        valid = np.flatnonzero(signatures[:, 0] < _PRIME)
+        pairs = []
+        for band in range(self.bands):
+            keys = np.ascontiguousarray(signatures[valid, band * self.rows:(band + 1) * self.rows])
+            keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * self.rows))).ravel()
+            _, first, bucket = np.unique(keys, return_index=True, return_inverse=True)
+            leaders = first[bucket]
+            linked = leaders != np.arange(len(valid))
+            pairs.append(np.column_stack([valid[leaders[linked]], valid[linked]]))
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate(pairs), axis=0)
+
+    def clusters(self, texts):
+        """Cluster id of every text; near-duplicates share an id."""
+        signatures = self.signatures(texts)
+        pairs = self.candidate_pairs(signatures)
+        if len(pairs):
+            # Drop band collisions whose estimated Jaccard is below the threshold
+            agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+            pairs = pairs[agreement >= self.threshold]
+        n = len(signatures)
+        graph = sp.csr_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+        return labels
+
+
+def deduplicate(df, text_column='text', threshold=0.8, by=None, **kwargs):
+    """``df`` without near-duplicate reviews, keeping the first of each cluster.
+
+    With ``by`` (a column such as ``'place_id'``, or a list of columns) only
+    reviews with the same values there count as duplicates, so identical
+    short reviews of different places are kept. Extra keyword arguments go
+    to ``MinHashLSH``.
+    """
+    labels = MinHashLSH(threshold, **kwargs).clusters(df[text_column])
+    keys = pd.DataFrame({'cluster': labels}, index=df.index)
+    if by is not None:
+        for column in [by] if isinstance(by, str) else by:
+            keys[column] = df[column]
+    return df[~keys.duplicated()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report and drop near-duplicate reviews.')
+    parser.add_argument('paths', nargs='+', help='review CSV files')
+    parser.add_argument('--text-column', default='text')
+    parser.add_argument('--threshold', type=float, default=0.8, help='minimum Jaccard similarity of duplicates')
+    parser.add_argument('--num-perm', type=int, default=128)
+    parser.add_argument('--shingle-size', type=int, default=3)
+    parser.add_argument('--by', help='only count duplicates within this column, e.g. place_id')
+    parser.add_argument('--suffix', help='write each deduplicated file next to it with this suffix, e.g. _dedup')
+    args = parser.parse_args()
+
+    options = {'threshold': args.threshold, 'num_perm': args.num_perm, 'shingle_size': args.shingle_size}
+    frames = []
+    for path in args.paths:
+        df = load(path)
+        if args.text_column not in df:
+            print(f'{path}: no {args.text_column!r} column, skipped')
+            continue
+        start = time.perf_counter()
+        kept = deduplicate(df, args.text_column, by=args.by, **options)
+        print(f'{path}: {len(df)} rows, {len(df) - len(kept)} near-duplicates '
+              f'({time.perf_counter() - start:.2f} s)')
+        if args.suffix:
+            # Copy the kept rows from the raw file so their values keep the raw_data format
+            raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+            root, extension = path.rsplit('.', 1)
+            raw.iloc[df.index.get_indexer(kept.index)].to_csv(f'{root}{args.suffix}.{extension}', index=False)
+        frames.append(df[[args.text_column]])
+
+    if len(frames) > 1:
+        corpus = pd.concat(frames, ignore_index=True)
+        start = time.perf_counter()
+        kept = deduplicate(corpus, args.text_column, **options)
+        print(f'All files: {len(corpus)} rows, {len(corpus) - len(kept)} near-duplicates across files '
+              f'({time.perf_counter() - start:.2f} s)')
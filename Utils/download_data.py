@@ -122,9 +122,10 @@
 #                     review_df.to_csv(review_csv_file_path, index=False)
 # print('done')
 
-import pandas as pd
-import requests
-import time
+from async_crawler import crawl, crawl_tiles
+from columnar_store import ParquetSink
+from crawl_state import CrawlState, CsvSink
+from tiling import TilePlanner
 
 # API Key
 api_key = 'YOUR_API_KEY'
@@ -140,69 +141,59 @@ locations_coords = {
 radius = 10000
 place_type = 'restaurant'
 
-# Column headers
-unique_places_headers = [
-    'place_id', 'name', 'opening_hours.weekday_text', 'permanently_closed',
-    'adr_address', 'url', 'geometry.location.lng', 'geometry.location.lat',
-    'plus_code.global_code', 'formatted_address', 'rating', 'wheelchair_accessible',
-    'user_ratings_total', 'price_level', 'address_components', 'vicinity',
-    'plus_code.compound_code', 'scope', 'website', 'business_status', 'types'
-]
+# Tiled crawl: each city box is covered by geohash tiles sized to tile_radius,
+# all result pages are followed and tiles next to saturated ones are skipped.
+# Set use_tiling = False to search the points in locations_coords instead.
+use_tiling = True
+city_centres = {
+    'Warszawa': (52.2297, 21.0122),
+    'Wrocław': (51.1079, 17.0385),
+    'Kraków': (50.0614, 19.9366),
+    'Poznań': (52.4064, 16.9252),
+    'Gdańsk': (54.3520, 18.6466),
+    'Łódź': (51.7592, 19.4550),
+    'Katowice': (50.2599, 19.0216),
+    'Lublin': (51.2465, 22.5684),
+    'Bydgoszcz': (53.1235, 18.0084),
+    'Szczecin': (53.4285, 14.5528),
+    'Białystok': (53.1325, 23.1688),
+    'Rzeszów': (50.0413, 21.9990),
+}
+tile_radius = 1000
+city_extent = 3000
 
-review_headers = [
-    'place_id', 'author_name', 'language', 'original_language', 'rating',
-    'relative_time_description', 'text', 'time', 'translated'
-]
+# Request rate limits; details for many places are fetched concurrently
+max_qps = 10
+max_concurrency = 8
 
 # CSV file paths
 places_csv_file_path = '../raw_data/places.csv'
 review_csv_file_path = '../raw_data/reviews_1.csv'
 
-# Load or create DataFrames
-places_df = pd.read_csv(places_csv_file_path) if pd.io.common.file_exists(places_csv_file_path) else pd.DataFrame(columns=unique_places_headers)
-review_df = pd.read_csv(review_csv_file_path) if pd.io.common.file_exists(review_csv_file_path) else pd.DataFrame(columns=review_headers)
-
-for city in locations_coords:
-    url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={locations_coords[city]}&radius={radius}&type={place_type}&key={api_key}"
-    response = requests.get(url)
-    places = response.json()
-    print(places['results'])
-
-    # Process each place
-    if 'results' in places:
-        for place in places['results']:
-            place_id = place.get('place_id')
-            if place_id and place_id not in places_df['place_id'].values:
-                # Place Details
-                details_url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&key={api_key}"
-                details_response = requests.get(details_url)
-                place_details = details_response.json()
-
-                if 'result' in place_details:
-                    unique_places_record = [place_details['result'].get(header, None) for header in unique_places_headers]
-                    places_df.loc[len(places_df)] = unique_places_record
-
-                    # Process reviews if they exist
-                    if 'reviews' in place_details['result']:
-                        for review in place_details['result']['reviews']:
-                            review_record = [
-                                place_id,
-                                review.get('author_name', None),
-                                review.get('language', None),
-                                review.get('original_language', None),
-                                review.get('rating', None),
-                                review.get('relative_time_description', None),
-                                review.get('text', None),
-                                review.get('time', None),
-                                review.get('translated', None)
-                            ]
-                            review_df.loc[len(review_df)] = review_record
-
-    # Optional delay to prevent hitting rate limits
-    time.sleep(1)
-
-# Save DataFrames to CSVs
-places_df.to_csv(places_csv_file_path, index=False)
-review_df.to_csv(review_csv_file_path, index=False)
+# 'parquet' appends partitioned files to the columnar store (see columnar_store.py),
+# 'csv' appends rows to the CSV files above
+output_format = 'parquet'
+store_path = '../raw_data/store'
+
+# Crawl checkpoint; delete it (or call state.reset_cursors()) to crawl all cities again
+crawl_state_path = '../raw_data/crawl_state'
+flush_every_places = 50
+
+# Results are written to the sink in batches; an interrupted run resumes
+# from the last checkpoint and skips places and reviews already stored
+if output_format == 'parquet':
+    sink = ParquetSink(store_path)
+else:
+    sink = CsvSink(places_csv_file_path, review_csv_file_path)
+state = CrawlState(crawl_state_path, sink, batch_size=flush_every_places)
+
+if use_tiling:
+    planner = TilePlanner(city_centres, radius=tile_radius, extent_m=city_extent)
+    crawl_tiles(planner, api_key, place_type=place_type, state=state,
+                qps=max_qps, max_concurrency=max_concurrency)
+    print(planner.stats())
+else:
+    crawl(locations_coords, api_key, radius=radius, place_type=place_type, state=state,
+          qps=max_qps, max_concurrency=max_concurrency)
 
 print('Done')
@@ -0,0 +1,186 @@
+"""Shared text features for training, EDA and the classifiers.
+
+Two vectorizers produce the TF-IDF matrices:
+
+* ``TfidfVectorizer(**TFIDF_DEFAULTS)`` - the vocabulary-based setup every
+  notebook builds (5000 features, uni- and bigrams);
+* ``HashingTfidf`` - stateless hashing of uni- and bigrams into a fixed
+  number of columns. Only the document frequency of each column is kept.
+  It can be updated chunk by chunk (online IDF) without holding a
+  vocabulary dict in memory.
+
+``FeatureStore`` caches a fitted vectorizer and its CSR matrix on disk, keyed
+by a hash of the texts and of the vectorizer settings. Every notebook asking
+for the same featurization of the same data loads it instead of refitting::
+
+    store = FeatureStore('../features')
+    X, vectorizer = store.featurize(df['text'], HashingTfidf(), name='clean_data')
+    X, vectorizer = store.featurize(df['text'], TfidfVectorizer(max_features=50, ngram_range=(1, 2)))
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+TFIDF_DEFAULTS = {'stop_words': 'english', 'max_features': 5000, 'ngram_range': (1, 2)}
+
+
+class HashingTfidf(TransformerMixin, BaseEstimator):
+    """TF-IDF over hashed n-grams with incrementally estimated IDF.
+
+    Uses the same IDF formula as ``TfidfVectorizer`` (smoothed, plus one),
+    so with no hash collisions the values match it term for term.
+    """
+
+    def __init__(self, n_features=2 ** 20, ngram_range=(1, 2), stop_words='english',
+                 lowercase=True, norm='l2', sublinear_tf=False):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.stop_words = stop_words
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+
+    def _hasher(self):
+        return HashingVectorizer(n_features=self.n_features, ngram_range=self.ngram_range,
+                                 stop_words=self.stop_words, lowercase=self.lowercase,
+                                 alternate_sign=False, norm=None, dtype=np.float64)
+
+    def _counts(self, texts):
+        texts = list(texts)
+        if not texts:
+            return sp.csr_matrix((0, self.n_features))
+        return self._hasher().transform(texts)
+
+    def _update(self, counts):
+        if not hasattr(self, 'document_frequency_'):
+            self.document_frequency_ = np.zeros(self.n_features, dtype=np.int64)
+            self.n_documents_ = 0
+        # Columns are summed per row, so each index occurs once per document
+        self.document_frequency_ += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents_ += counts.shape[0]
+
+    def partial_fit(self, texts, y=None):
+        """Add the document frequencies of another chunk of ``texts``."""
+        self._update(self._counts(texts))
+        return self
+
+    def fit(self, texts, y=None):
+        for attribute in ('document_frequency_', 'n_documents_'):
+            self.__dict__.pop(attribute, None)
+        return self.partial_fit(texts)
+
+    @property
+    def idf_(self):
+        return np.log((1 + self.n_documents_) / (1 + self.document_frequency_)) + 1
+
+    def _weight(self, counts):
+        if self.sublinear_tf:
+            np.log(counts.data, counts.data)
+            counts.data += 1
+        counts = counts @ sp.diags(self.idf_)
+        return normalize(counts, norm=self.norm, copy=False) if self.norm else counts
+
+    def transform(self, texts):
+        return self._weight(self._counts(texts))
+
+    def fit_transform(self, texts, y=None, chunk_size=50000):
+        """Fit and transform in chunks; the texts are hashed only once."""
+        for attribute in ('document_frequency_', 'n_documents_'):
+            self.__dict__.pop(attribute, None)
+        texts = list(texts)
+        chunks = []
+        for i in range(0, len(texts), chunk_size):
+            counts = self._counts(texts[i:i + chunk_size])
+            self._update(counts)
+            chunks.append(counts)
+        if not chunks:
+            counts = self._counts([])
+            self._update(counts)
+            return counts
+        return self._weight(sp.vstack(chunks, format='csr'))
+
+
+def dataset_key(texts):
+    """Hash of the texts, in order."""
+    digest = hashlib.blake2b(digest_size=8)
+    for text in texts:
+        digest.update(str(text).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def config_key(vectorizer):
+    """Hash of the vectorizer class and its parameters."""
+    config = {'class': type(vectorizer).__name__, 'params': vectorizer.get_params()}
+    raw = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+class FeatureStore:
+    """CSR matrices and fitted vectorizers cached under ``root``.
+
+    Each entry is a directory ``{name}-{dataset_key}-{config_key}`` holding
+    ``X.npz`` (``scipy.sparse.save_npz``), ``vectorizer.joblib`` and
+    ``meta.json``.
+    """
+
+    def __init__(self, root='../features'):
+        self.root = root
+
+    def path(self, texts, vectorizer, name='data'):
+        return os.path.join(self.root, f'{name}-{dataset_key(texts)}-{config_key(vectorizer)}')
+
+    def featurize(self, texts, vectorizer=None, name='data'):
+        """``(X, fitted_vectorizer)`` for ``texts``, from the cache if possible.
+
+        ``vectorizer`` is an unfitted template (``TfidfVectorizer`` with the
+        notebooks' settings by default) and is never modified itself.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        if vectorizer is None:
+            vectorizer = TfidfVectorizer(**TFIDF_DEFAULTS)
+        texts = [str(text) for text in texts]
+        path = self.path(texts, vectorizer, name)
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            return sp.load_npz(os.path.join(path, 'X.npz')), joblib.load(os.path.join(path, 'vectorizer.joblib'))
+
+        fitted = clone(vectorizer)
+        X = fitted.fit_transform(texts).tocsr()
+        self._write(path, X, fitted, name)
+        return X, fitted
+
+    def _write(self, path, X, vectorizer, name):
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        sp.save_npz(os.path.join(tmp_path, 'X.npz'), X, compressed=False)
+        joblib.dump(vectorizer, os.path.join(tmp_path, 'vectorizer.joblib'))
+        meta = {'name': name, 'shape': list(X.shape), 'nnz': int(X.nnz),
+                'vectorizer': type(vectorizer).__name__,
+                'params': json.loads(json.dumps(vectorizer.get_params(), default=str))}
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        """``meta.json`` of every cached featurization."""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for entry in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, entry, 'meta.json')
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding='utf-8') as f:
+                    entries.append({'path': os.path.join(self.root, entry), **json.load(f)})
+        return entries
@@ -0,0 +1,300 @@
+"""Successive-halving and Hyperband search over TF-IDF and classifier settings.
+
+A candidate is one vectorizer setting (overrides of ``TFIDF_DEFAULTS``)
+combined with one model and its parameters. All candidates are first
+trained on a small subset of the training split. Only the best
+``1 / factor`` are kept, and those are retrained on ``factor`` times more
+rows. This repeats until the full training split is reached; a single
+survivor goes straight to it. The rung sizes are counted down from the full
+split, so every bracket ends on exactly the same rows. ``hyperband`` runs several such brackets, trading the
+number of sampled candidates against the size of the first subset.
+
+Every vectorizer setting is featurized once through ``features.FeatureStore``.
+Every trial with that setting, at any subset size, slices the same cached
+matrix. As in the notebooks, the vectorizer is fitted on the whole dataset
+before the split. Trials of a rung run in a process pool. Their results
+are memoized under ``cache_dir``, so a rerun only fits new trials::
+
+    trials = successive_halving(df, candidates(), n_jobs=-1)
+    front = pareto_front(trials)
+
+    python hyperparameter_search.py --data ../raw_data/clean_data.csv --method hyperband --n-jobs -1
+
+Every trial is written to ``{output}_trials.csv``. Per aspect, the trials
+on the full training split that no other such trial beats on both
+validation accuracy and training time go to ``{output}_pareto.csv``.
+"""
+
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputClassifier
+
+from dataset_loader import load
+from features import TFIDF_DEFAULTS, FeatureStore, config_key, dataset_key
+from joint_model import JointAspectClassifier
+from model_comparison import encode_labels
+from review_classifier import ASPECTS, base_classifier
+
+VECTORIZER_GRID = {
+    'max_features': [2000, 5000, 20000],
+    'ngram_range': [(1, 1), (1, 2)],
+    'sublinear_tf': [False, True],
+}
+
+# Parameters of the per-aspect estimators from base_classifier ('joint' is
+# the JointAspectClassifier itself)
+MODEL_GRIDS = {
+    'logistic_regression': {'C': [0.3, 1.0, 3.0, 10.0]},
+    'random_forest': {'n_estimators': [50, 100, 200], 'min_samples_leaf': [1, 2]},
+    'linear_svc': {'estimator__C': [0.1, 0.3, 1.0]},
+    'sgd': {'alpha': [1e-6, 1e-5, 1e-4]},
+    'joint': {'C': [1.0, 3.0, 10.0]},
+}
+
+_features = {}
+_labels = None
+
+
+def _grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def candidates(models=('logistic_regression', 'linear_svc', 'sgd', 'joint'), vectorizer_grid=None, model_grids=None):
+    """Every ``(vectorizer_params, model, model_params)`` combination of the grids."""
+    vectorizer_grid = VECTORIZER_GRID if vectorizer_grid is None else vectorizer_grid
+    model_grids = MODEL_GRIDS if model_grids is None else model_grids
+    return [(vectorizer_params, model, model_params)
+            for vectorizer_params in _grid(vectorizer_grid)
+            for model in models
+            for model_params in _grid(model_grids.get(model, {}))]
+
+
+def describe(candidate):
+    vectorizer_params, model, model_params = candidate
+    settings = ' '.join(f'{name}={value}' for name, value in {**model_params, **vectorizer_params}.items())
+    return f'{model} {settings}'.strip()
+
+
+def build_estimator(model, params):
+    """Unfitted multi-output estimator for ``model`` with ``params`` set."""
+    if model == 'joint':
+        return JointAspectClassifier(**params)
+    return MultiOutputClassifier(base_classifier(model).set_params(**params))
+
+
+def rung_sizes(n_train, min_rows, factor):
+    """Training rows of each rung: at least ``min_rows``, then ``factor`` times more, ending at ``n_train``."""
+    n_rungs = 1
+    while n_train // factor ** n_rungs >= min_rows:
+        n_rungs += 1
+    return [n_train // factor ** (n_rungs - 1 - rung) for rung in range(n_rungs)]
+
+
+def _load_data(labels):
+    global _labels
+    _labels = labels
+
+
+def _run_trial(features_path, estimator, train_index, test_index):
+    # Workers keep each feature matrix after its first trial
+    if features_path not in _features:
+        _features[features_path] = sp.load_npz(features_path)
+    X, Y = _features[features_path], _labels
+
+    start = time.perf_counter()
+    fitted = clone(estimator).fit(X[train_index], Y[train_index])
+    fit_seconds = time.perf_counter() - start
+
+    predicted = fitted.predict(X[test_index])
+    result = {'fit_s': fit_seconds}
+    for i, aspect in enumerate(ASPECTS):
+        result[f'{aspect}_accuracy'] = accuracy_score(Y[test_index, i], predicted[:, i])
+    result['mean_accuracy'] = float(np.mean([result[f'{aspect}_accuracy'] for aspect in ASPECTS]))
+    return result
+
+
+class _Search:
+    """Shared state of one search: split, cached features and the trial pool."""
+
+    def __init__(self, df, n_jobs, feature_store, cache_dir, test_size, seed):
+        self.feature_store = feature_store or FeatureStore()
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self.cache_dir = cache_dir
+        df, self.labels = encode_labels(df)
+        self.texts = df['text'].astype(str).tolist()
+        self.data_key = dataset_key(self.texts)
+
+        train_index, self.test_index = train_test_split(np.arange(len(self.texts)), test_size=test_size,
+                                                        random_state=seed)
+        # Nested subsets: the first n rows of one shuffled training split
+        self.train_index = np.random.default_rng(seed).permutation(train_index)
+        self.trials = []
+        self._executor = None
+
+    def __enter__(self):
+        # Single pending trials run in this process
+        _load_data(self.labels)
+        if self.n_jobs > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_load_data,
+                                                 initargs=(self.labels,))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def features_path(self, vectorizer_params):
+        vectorizer = TfidfVectorizer(**{**TFIDF_DEFAULTS, **vectorizer_params})
+        self.feature_store.featurize(self.texts, vectorizer)
+        return os.path.join(self.feature_store.path(self.texts, vectorizer), 'X.npz'), config_key(vectorizer)
+
+    def evaluate(self, candidates, n_rows, bracket, rung):
+        """Train every candidate on ``n_rows`` training rows; returns their trial rows."""
+        train_index = self.train_index[:n_rows]
+        rows, pending = [], []
+        for candidate in candidates:
+            vectorizer_params, model, model_params = candidate
+            features_path, vectorizer_key = self.features_path(vectorizer_params)
+            estimator = build_estimator(model, model_params)
+            key = joblib.hash((self.data_key, self.labels, vectorizer_key, estimator, train_index, self.test_index))
+            path = os.path.join(self.cache_dir, f'{model}-{key[:16]}.joblib')
+            row = {'candidate': describe(candidate), 'model': model, 'bracket': bracket, 'rung': rung,
+                   'train_rows': n_rows, 'vectorizer': vectorizer_params, 'params': model_params}
+            if os.path.exists(path):
+                rows.append({**row, 'cached': True, **joblib.load(path)})
+            else:
+                pending.append((row, path, (features_path, estimator, train_index, self.test_index)))
+
+        if self._executor is not None and len(pending) > 1:
+            futures = [self._executor.submit(_run_trial, *args) for _, _, args in pending]
+            results = [future.result() for future in futures]
+        else:
+            results = [_run_trial(*args) for _, _, args in pending]
+        for (row, path, _), result in zip(pending, results):
+            joblib.dump(result, path)
+            rows.append({**row, 'cached': False, **result})
+
+        self.trials.extend(rows)
+        return rows
+
+    def halving(self, candidates, min_rows, factor, bracket=0):
+        sizes = rung_sizes(len(self.train_index), min_rows, factor)
+        rung = 0
+        while True:
+            rows = self.evaluate(candidates, sizes[rung], bracket, rung)
+            print(f'bracket {bracket} rung {rung}: {len(candidates)} candidates on {sizes[rung]} rows, '
+                  f'best {max(row["mean_accuracy"] for row in rows):.3f}')
+            if rung == len(sizes) - 1:
+                return
+            order = np.argsort([-row['mean_accuracy'] for row in rows], kind='stable')
+            candidates = [candidates[i] for i in order[:max(1, len(candidates) // factor)]]
+            # Nothing is left to compare, so the survivor skips to the full split
+            rung = len(sizes) - 1 if len(candidates) == 1 else rung + 1
+
+    def table(self):
+        trials = pd.DataFrame(self.trials)
+        for column in ('vectorizer', 'params'):
+            trials[column] = trials[column].astype(str)
+        return trials
+
+
+def _write(trials, output):
+    if output:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        trials.to_csv(f'{output}_trials.csv', index=False)
+        pareto_front(trials).to_csv(f'{output}_pareto.csv', index=False)
+    return trials
+
+
+def successive_halving(df, candidates, min_rows=200, factor=3, n_jobs=1, feature_store=None,
+                       cache_dir='../models/search', output='../models/search', test_size=0.2, seed=42):
+    """Successive halving over ``candidates``; returns a table of every trial."""
+    with _Search(df, n_jobs, feature_store, cache_dir, test_size, seed) as search:
+        search.halving(list(candidates), min_rows, factor)
+    return _write(search.table(), output)
+
+
+def hyperband(df, candidates, min_rows=200, factor=3, n_jobs=1, feature_store=None,
+              cache_dir='../models/search', output='../models/search', test_size=0.2, seed=42):
+    """Hyperband: successive-halving brackets from many candidates on few rows
+    to a few candidates on all rows, each with a random sample of ``candidates``.
+    """
+    candidates = list(candidates)
+    rng = np.random.default_rng(seed)
+    with _Search(df, n_jobs, feature_store, cache_dir, test_size, seed) as search:
+        n_train = len(search.train_index)
+        s_max = max(0, int(math.log(n_train / min_rows, factor)))
+        for s in range(s_max, -1, -1):
+            n_candidates = min(len(candidates), math.ceil((s_max + 1) / (s + 1) * factor ** s))
+            sample = [candidates[i] for i in rng.choice(len(candidates), n_candidates, replace=False)]
+            search.halving(sample, max(min_rows, n_train // factor ** s), factor, bracket=s_max - s)
+    return _write(search.table(), output)
+
+
+def pareto_front(trials, train_rows=None):
+    """Per aspect, the trials not beaten on both accuracy and training time.
+
+    Only trials trained on ``train_rows`` rows are compared, by default the
+    largest rung (the full training split): a trial on fewer rows is always
+    faster, so mixing rungs would put the small first rungs on the front.
+    A candidate trained on that size in several brackets counts once.
+    """
+    if train_rows is None:
+        train_rows = trials['train_rows'].max()
+    trials = trials[trials['train_rows'] == train_rows].drop_duplicates('candidate')
+    fronts = []
+    for aspect in ASPECTS:
+        ordered = trials.sort_values(['fit_s', f'{aspect}_accuracy'], ascending=[True, False], kind='stable')
+        best = ordered[f'{aspect}_accuracy'].cummax()
+        # A trial is on the front if it is more accurate than every faster one
+        on_front = ordered[f'{aspect}_accuracy'] > best.shift(fill_value=-np.inf)
+        front = ordered[on_front]
+        fronts.append(pd.DataFrame({
+            'aspect': aspect,
+            'candidate': front['candidate'],
+            'train_rows': front['train_rows'],
+            'fit_s': front['fit_s'],
+            'accuracy': front[f'{aspect}_accuracy'],
+        }))
+    return pd.concat(fronts, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='../raw_data/clean_data.csv')
+    parser.add_argument('--models', nargs='+', default=['logistic_regression', 'linear_svc', 'sgd', 'joint'],
+                        choices=list(MODEL_GRIDS))
+    parser.add_argument('--method', choices=['halving', 'hyperband'], default='halving')
+    parser.add_argument('--min-rows', type=int, default=200, help='training rows of the first rung')
+    parser.add_argument('--factor', type=int, default=3, help='keep 1/factor candidates, grow rows by factor')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--features', default='../features', help='feature store directory')
+    parser.add_argument('--cache-dir', default='../models/search')
+    parser.add_argument('--output', default='../models/search')
+    args = parser.parse_args()
+
+    search = successive_halving if args.method == 'halving' else hyperband
+    trials = search(load(args.data), candidates(args.models), min_rows=args.min_rows, factor=args.factor,
+                    n_jobs=args.n_jobs, feature_store=FeatureStore(args.features), cache_dir=args.cache_dir,
+                    output=args.output)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_colwidth', 80):
+        print(trials.sort_values('mean_accuracy', ascending=False).head(10)[
+            ['candidate', 'train_rows', 'fit_s', 'mean_accuracy']].round(3).to_string(index=False))
+        print()
+        print(f"Pareto front of the trials on the full training split ({trials['train_rows'].max()} rows):")
+        print(pareto_front(trials).round(3).to_string(index=False))
@@ -0,0 +1,87 @@
+"""One model for all three aspects instead of three independent estimators.
+
+``JointAspectClassifier`` is a multinomial logistic regression with one
+softmax head per aspect. The heads share a single weight matrix whose
+columns are split into food / service / atmosphere blocks. Prediction is
+therefore one sparse matrix multiply followed by an argmax per block. All
+heads are fitted together with L-BFGS on the summed cross-entropy, using the
+same L2 penalty as ``LogisticRegression``.
+
+It has the fit / predict / predict_proba interface of
+``MultiOutputClassifier``, so ``RestaurantReviewClassifier(model='joint')``
+uses it as a drop-in replacement.
+"""
+
+import numpy as np
+from scipy.optimize import minimize
+from scipy.special import log_softmax
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+
+class JointAspectClassifier(ClassifierMixin, BaseEstimator):
+    """Multinomial logistic regression with one softmax block per output.
+
+    ``C`` is the inverse regularisation strength, as in ``LogisticRegression``.
+    After fitting, ``coef_`` is ``(n_features, total_classes)``,
+    ``intercept_`` is ``(total_classes,)`` and ``classes_`` lists the labels
+    of every output.
+    """
+
+    def __init__(self, C=1.0, max_iter=1000, tol=1e-4):
+        self.C = C
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def _blocks(self):
+        return [slice(start, stop) for start, stop in zip(self.offsets_[:-1], self.offsets_[1:])]
+
+    def _loss_and_grad(self, params, X, codes, n_features):
+        W = params[:-self.offsets_[-1]].reshape(n_features, -1)
+        b = params[-self.offsets_[-1]:]
+        Z = X @ W + b
+        n_samples = Z.shape[0]
+        # Mean loss, as LogisticRegression scales it for better conditioning
+        alpha = 1 / (self.C * n_samples)
+        loss = 0.5 * alpha * np.dot(W.ravel(), W.ravel())
+        G = np.empty_like(Z)
+        rows = np.arange(n_samples)
+        for block, y in zip(self._blocks(), codes.T):
+            log_p = log_softmax(Z[:, block], axis=1)
+            loss -= log_p[rows, y].sum() / n_samples
+            G[:, block] = np.exp(log_p)
+            G[rows, block.start + y] -= 1
+        G /= n_samples
+        grad_W = X.T @ G + alpha * W
+        grad_b = G.sum(axis=0)
+        return loss, np.concatenate([np.asarray(grad_W).ravel(), grad_b])
+
+    def fit(self, X, Y):
+        Y = np.asarray(Y)
+        self.classes_ = []
+        codes = np.empty(Y.shape, dtype=np.int64)
+        for i in range(Y.shape[1]):
+            classes, codes[:, i] = np.unique(Y[:, i], return_inverse=True)
+            self.classes_.append(classes)
+        self.offsets_ = np.concatenate([[0], np.cumsum([len(classes) for classes in self.classes_])])
+
+        n_features = X.shape[1]
+        initial = np.zeros(n_features * self.offsets_[-1] + self.offsets_[-1])
+        result = minimize(self._loss_and_grad, initial, args=(X, codes, n_features), jac=True,
+                          method='L-BFGS-B', options={'maxiter': self.max_iter, 'gtol': self.tol})
+        self.n_iter_ = result.nit
+        self.coef_ = result.x[:-self.offsets_[-1]].reshape(n_features, -1)
+        self.intercept_ = result.x[-self.offsets_[-1]:]
+        return self
+
+    def decision_function(self, X):
+        return np.asarray(X @ self.coef_) + self.intercept_
+
+    def predict(self, X):
+        Z = self.decision_function(X)
+        return np.column_stack([classes[Z[:, block].argmax(axis=1)]
+                                for classes, block in zip(self.classes_, self._blocks())])
+
+    def predict_proba(self, X):
+        """One ``(n, n_classes)`` array per output, like ``MultiOutputClassifier``."""
+        Z = self.decision_function(X)
+        return [np.exp(log_softmax(Z[:, block], axis=1)) for block in self._blocks()]
@@ -0,0 +1,339 @@
+"""LSTM review classifier from first_model.ipynb, with a saved inference path.
+
+The notebook pads every review to ``max_len=100``. Here reviews are sorted
+into batches of similar length and each batch is padded only to its own
+longest review (at most ``max_len`` tokens), so short reviews no longer pay
+for 100 LSTM steps. The network is the notebook's
+Embedding + 3xLSTM + Dropout with one softmax head per aspect, built with a
+variable-length input.
+
+A trained model is saved as an artifact directory, like
+``review_classifier.py``, and can be exported to TensorFlow Lite for CPU
+inference::
+
+    classifier = LSTMReviewClassifier()
+    classifier.train(df, epochs=10)
+    classifier.save('../models/lstm')
+    classifier.export_tflite('../models/lstm')
+
+    LSTMReviewClassifier.load('../models/lstm').predict_frame(texts)
+    TFLiteReviewClassifier.load('../models/lstm').predict_frame(texts)
+
+TensorFlow is imported only when a model is built, loaded or exported.
+"""
+
+import datetime
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+ASPECTS = ['food', 'service', 'atmosphere']
+
+# Bump when the artifact layout changes
+ARTIFACT_VERSION = 1
+
+KERAS_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+
+class WordTokenizer:
+    """The ``keras.preprocessing.text.Tokenizer`` behaviour the notebook used.
+
+    Words are lowercased and split on punctuation and spaces. They are
+    numbered from 1 by decreasing frequency (ties keep first-seen order), and
+    only ids below ``num_words`` are emitted. It serializes to plain JSON.
+    """
+
+    def __init__(self, num_words=None, filters=KERAS_FILTERS, lower=True):
+        self.num_words = num_words
+        self.filters = filters
+        self.lower = lower
+        self.word_index = {}
+        self._table = str.maketrans({c: ' ' for c in filters})
+
+    def words(self, text):
+        if self.lower:
+            text = text.lower()
+        return [word for word in text.translate(self._table).split(' ') if word]
+
+    def fit_on_texts(self, texts):
+        counts = Counter()
+        for text in texts:
+            counts.update(self.words(text))
+        ordered = sorted(counts.items(), key=lambda item: -item[1])
+        self.word_index = {word: i for i, (word, _) in enumerate(ordered, start=1)}
+        return self
+
+    def texts_to_sequences(self, texts):
+        limit = self.num_words or float('inf')
+        sequences = []
+        for text in texts:
+            ids = (self.word_index.get(word) for word in self.words(text))
+            sequences.append([i for i in ids if i is not None and i < limit])
+        return sequences
+
+    def to_json(self):
+        return json.dumps({'num_words': self.num_words, 'filters': self.filters,
+                           'lower': self.lower, 'word_index': self.word_index}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, content):
+        config = json.loads(content)
+        tokenizer = cls(config['num_words'], config['filters'], config['lower'])
+        tokenizer.word_index = config['word_index']
+        return tokenizer
+
+
+def bucket_batches(lengths, batch_size, rng=None):
+    """Index arrays of ``batch_size`` reviews with similar lengths.
+
+    With ``rng`` ties are broken randomly and the batch order is shuffled
+    (training); without it the batches follow increasing length.
+    """
+    lengths = np.asarray(lengths)
+    if rng is None:
+        order = np.argsort(lengths, kind='stable')
+    else:
+        order = np.lexsort((rng.random(len(lengths)), lengths))
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    if rng is not None:
+        rng.shuffle(batches)
+    return batches
+
+
+def pad_batch(sequences, indices, max_len):
+    """Pre-pad / pre-truncate ``sequences[indices]`` to their longest length.
+
+    Matches ``pad_sequences(..., maxlen=max_len)`` once the extra leading
+    zeros are dropped. Every batch has at least one column.
+    """
+    width = max(1, min(max_len, max(len(sequences[i]) for i in indices)))
+    batch = np.zeros((len(indices), width), dtype=np.int32)
+    for row, i in enumerate(indices):
+        sequence = sequences[i][-width:]
+        if sequence:
+            batch[row, width - len(sequence):] = sequence
+    return batch
+
+
+def _bucketed_sequence(sequences, labels, batch_size, max_len, seed):
+    """Keras ``Sequence`` of length-bucketed training batches."""
+    import tensorflow as tf
+
+    class BucketedBatches(tf.keras.utils.Sequence):
+        def __init__(self):
+            super().__init__()
+            self.rng = np.random.default_rng(seed)
+            self.lengths = [min(len(sequence), max_len) for sequence in sequences]
+            self.batches = bucket_batches(self.lengths, batch_size, self.rng)
+
+        def __len__(self):
+            return len(self.batches)
+
+        def __getitem__(self, index):
+            indices = self.batches[index]
+            X = pad_batch(sequences, indices, max_len)
+            y = {f'{category}_output': labels[indices, i] for i, category in enumerate(ASPECTS)}
+            return X, y
+
+        def on_epoch_end(self):
+            self.batches = bucket_batches(self.lengths, batch_size, self.rng)
+
+    return BucketedBatches()
+
+
+class LSTMReviewClassifier:
+    def __init__(self, max_words=5000, max_len=100):
+        self.max_words = max_words
+        self.max_len = max_len
+        self.tokenizer = WordTokenizer(num_words=max_words)
+        self.label_encoders = {
+            'food': LabelEncoder(),
+            'service': LabelEncoder(),
+            'atmosphere': LabelEncoder()
+        }
+        self.model = None
+
+    def clean_text(self, text):
+        """Convert to string and handle NaN values"""
+        if pd.isna(text):
+            return ''
+        return str(text)
+
+    def preprocess_data(self, df):
+        df = df.copy()
+        df['text'] = df['text'].apply(self.clean_text)
+        df = df[df['text'].str.len() > 0]
+
+        self.tokenizer.fit_on_texts(df['text'])
+        sequences = self.tokenizer.texts_to_sequences(df['text'])
+
+        label_arrays = []
+        for category in ASPECTS:
+            labels = df[category].fillna('None').astype(str)
+            label_arrays.append(self.label_encoders[category].fit_transform(labels))
+        return sequences, np.column_stack(label_arrays)
+
+    def create_model(self, num_words, num_labels_dict):
+        from tensorflow.keras.layers import LSTM, Dense, Dropout, Embedding, Input
+        from tensorflow.keras.models import Model
+
+        # Variable-length input: each batch is only as long as its longest review
+        input_layer = Input(shape=(None,), dtype='int32')
+        embedding = Embedding(num_words, 128)(input_layer)
+
+        lstm_layer = LSTM(64, return_sequences=True)(embedding)
+        lstm_layer = LSTM(64, return_sequences=True)(lstm_layer)
+        lstm_layer = LSTM(32, return_sequences=False)(lstm_layer)
+
+        dropout = Dropout(0.5)(lstm_layer)
+
+        outputs = [Dense(num_labels_dict[category], activation='softmax', name=f'{category}_output')(dropout)
+                   for category in ASPECTS]
+        model = Model(inputs=input_layer, outputs=outputs)
+
+        losses = {f'{category}_output': 'sparse_categorical_crossentropy' for category in ASPECTS}
+        metrics = {f'{category}_output': 'accuracy' for category in ASPECTS}
+        model.compile(optimizer='adam', loss=losses, metrics=metrics)
+        return model
+
+    def train(self, df, epochs=50, batch_size=32, seed=42):
+        sequences, y = self.preprocess_data(df)
+        train_index, test_index = train_test_split(np.arange(len(sequences)), test_size=0.2, random_state=42)
+        train_sequences = [sequences[i] for i in train_index]
+        test_sequences = [sequences[i] for i in test_index]
+
+        num_labels = {category: len(self.label_encoders[category].classes_) for category in ASPECTS}
+        self.model = self.create_model(self.max_words, num_labels)
+
+        history = self.model.fit(
+            _bucketed_sequence(train_sequences, y[train_index], batch_size, self.max_len, seed),
+            validation_data=_bucketed_sequence(test_sequences, y[test_index], batch_size, self.max_len, seed),
+            epochs=epochs,
+            verbose=1
+        )
+        return history
+
+    def _encode(self, texts):
+        return self.tokenizer.texts_to_sequences([self.clean_text(text) for text in texts])
+
+    def predict_proba(self, texts, batch_size=256):
+        """Per-aspect ``(n, n_classes)`` probabilities, in input order."""
+        sequences = self._encode(texts)
+        probabilities = [np.zeros((len(sequences), len(self.label_encoders[c].classes_)), dtype=np.float32)
+                         for c in ASPECTS]
+        for indices in bucket_batches([len(s) for s in sequences], batch_size):
+            outputs = self._run(pad_batch(sequences, indices, self.max_len))
+            for target, output in zip(probabilities, outputs):
+                target[indices] = output
+        return probabilities
+
+    def _run(self, batch):
+        return [np.asarray(output) for output in self.model(batch, training=False)]
+
+    def predict_frame(self, texts, return_proba=False, batch_size=256):
+        """Same frame layout as ``RestaurantReviewClassifier.predict_frame``."""
+        probabilities = self.predict_proba(texts, batch_size)
+        columns = {}
+        for category, proba in zip(ASPECTS, probabilities):
+            classes = self.label_encoders[category].classes_
+            columns[category] = pd.Categorical.from_codes(proba.argmax(axis=1), categories=classes)
+        if return_proba:
+            for category, proba in zip(ASPECTS, probabilities):
+                for j, label in enumerate(self.label_encoders[category].classes_):
+                    columns[f'{category}_{label}'] = proba[:, j]
+        return pd.DataFrame(columns)
+
+    def predict(self, texts):
+        """List of ``{aspect: label}`` dicts, one per text."""
+        return self.predict_frame(texts)[ASPECTS].astype(object).to_dict('records')
+
+    def _save_preprocessing(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'tokenizer.json'), 'w', encoding='utf-8') as f:
+            f.write(self.tokenizer.to_json())
+        for category in ASPECTS:
+            np.save(os.path.join(path, f'classes_{category}.npy'),
+                    self.label_encoders[category].classes_.astype(str))
+
+    def save(self, path):
+        """Write tokenizer, label classes and Keras model to ``path``."""
+        self._save_preprocessing(path)
+        self.model.save(os.path.join(path, 'model.keras'))
+        manifest = {
+            'artifact_version': ARTIFACT_VERSION,
+            'model': 'lstm',
+            'max_words': self.max_words,
+            'max_len': self.max_len,
+            'aspects': ASPECTS,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def _load_preprocessing(cls, path):
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['artifact_version'] != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported artifact version {manifest['artifact_version']}, "
+                             f"expected {ARTIFACT_VERSION}.")
+        self = cls.__new__(cls)
+        self.max_words = manifest['max_words']
+        self.max_len = manifest['max_len']
+        with open(os.path.join(path, 'tokenizer.json'), encoding='utf-8') as f:
+            self.tokenizer = WordTokenizer.from_json(f.read())
+        self.label_encoders = {}
+        for category in manifest['aspects']:
+            encoder = LabelEncoder()
+            encoder.classes_ = np.load(os.path.join(path, f'classes_{category}.npy')).astype(object)
+            self.label_encoders[category] = encoder
+        return self
+
+    @classmethod
+    def load(cls, path):
+        import tensorflow as tf
+
+        self = cls._load_preprocessing(path)
+        self.model = tf.keras.models.load_model(os.path.join(path, 'model.keras'))
+        return self
+
+    def export_tflite(self, path):
+        """Write ``model.tflite`` next to the saved artifact in ``path``."""
+        import tensorflow as tf
+
+        @tf.function(input_signature=[tf.TensorSpec([None, None], tf.int32, name='tokens')])
+        def serve(tokens):
+            outputs = self.model(tokens, training=False)
+            return {category: output for category, output in zip(ASPECTS, outputs)}
+
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], self.model)
+        # LSTMs over a dynamic time axis need the TF kernels for TensorList ops
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        converter._experimental_lower_tensor_list_ops = False
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        with open(os.path.join(path, 'model.tflite'), 'wb') as f:
+            f.write(converter.convert())
+
+
+class TFLiteReviewClassifier(LSTMReviewClassifier):
+    """CPU inference from ``model.tflite`` plus the saved tokenizer and labels."""
+
+    @classmethod
+    def load(cls, path, num_threads=None):
+        import tensorflow as tf
+
+        self = cls._load_preprocessing(path)
+        self.interpreter = tf.lite.Interpreter(model_path=os.path.join(path, 'model.tflite'),
+                                               num_threads=num_threads)
+        # The signature runner resizes the input to every batch shape
+        self.runner = self.interpreter.get_signature_runner()
+        return self
+
+    def _run(self, batch):
+        outputs = self.runner(tokens=batch)
+        return [outputs[category] for category in ASPECTS]
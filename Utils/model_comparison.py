@@ -0,0 +1,150 @@
+"""Cross-validated comparison of the review classifiers.
+
+Every candidate model is fitted on k folds of one shared, cached feature
+matrix (see ``features.FeatureStore``). All (model, fold) fits run at once in
+a process pool. A fitted fold is memoized under ``cache_dir``, keyed by the
+data, the feature settings, the estimator's parameters and the fold. If one
+model changes, a rerun only retrains that model::
+
+    summary = compare_models(df, ['logistic_regression', 'random_forest', 'svm'], n_jobs=-1)
+
+    python model_comparison.py --data ../raw_data/clean_data.csv --folds 5 --n-jobs -1
+
+The per-fold timings and per-aspect metrics are written to
+``{output}_folds.csv`` and the mean per model to ``{output}.csv``.
+As in the notebooks, the vectorizer is fitted on the whole dataset before
+the split.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import KFold
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from dataset_loader import load
+from features import FeatureStore, config_key, dataset_key
+from review_classifier import ASPECTS, RestaurantReviewClassifier, base_classifier
+
+_features = None
+_labels = None
+
+
+def _load_data(features_path, labels):
+    global _features, _labels
+    _features = sp.load_npz(features_path)
+    _labels = labels
+
+
+def _fit_fold(estimator, train_index, test_index):
+    X, Y = _features, _labels
+    start = time.perf_counter()
+    fitted = clone(estimator).fit(X[train_index], Y[train_index])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = fitted.predict(X[test_index])
+    predict_seconds = time.perf_counter() - start
+
+    result = {'fit_s': fit_seconds, 'predict_s': predict_seconds,
+              'train_rows': len(train_index), 'test_rows': len(test_index)}
+    for i, aspect in enumerate(ASPECTS):
+        result[f'{aspect}_accuracy'] = accuracy_score(Y[test_index, i], predicted[:, i])
+        result[f'{aspect}_f1_macro'] = f1_score(Y[test_index, i], predicted[:, i], average='macro')
+    return fitted, result
+
+
+def encode_labels(df):
+    """Preprocessed ``df`` and its ``(n, 3)`` integer label matrix."""
+    df = RestaurantReviewClassifier().preprocess_data(df)
+    labels = np.column_stack([LabelEncoder().fit_transform(df[aspect].astype(str)) for aspect in ASPECTS])
+    return df, labels
+
+
+def compare_models(df, models=('logistic_regression', 'random_forest', 'svm'), n_splits=5, n_jobs=1,
+                   vectorizer=None, feature_store=None, cache_dir='../models/folds',
+                   output='../models/comparison', seed=42):
+    """Cross-validate ``models`` and return the mean metrics per model.
+
+    ``models`` holds ``RestaurantReviewClassifier`` model names or maps
+    names to unfitted per-aspect estimators.
+    """
+    if not isinstance(models, dict):
+        models = {name: base_classifier(name) for name in models}
+    feature_store = feature_store or FeatureStore()
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+
+    df, labels = encode_labels(df)
+    texts = df['text'].astype(str).tolist()
+    X, vectorizer = feature_store.featurize(texts, vectorizer)
+    features_path = os.path.join(feature_store.path(texts, vectorizer), 'X.npz')
+    data_key = joblib.hash((dataset_key(texts), labels, config_key(vectorizer), n_splits, seed))
+
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X))
+    os.makedirs(cache_dir, exist_ok=True)
+
+    rows, pending = [], []
+    for name, estimator in models.items():
+        estimator = MultiOutputClassifier(estimator)
+        model_key = joblib.hash((data_key, estimator))
+        for fold, (train_index, test_index) in enumerate(folds):
+            path = os.path.join(cache_dir, f'{name}-{model_key[:16]}-fold{fold}.joblib')
+            if os.path.exists(path):
+                rows.append({'model': name, 'fold': fold, 'cached': True, **joblib.load(path)['result']})
+            else:
+                pending.append((name, fold, path, estimator, train_index, test_index))
+
+    if pending:
+        start = time.perf_counter()
+        if n_jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_load_data,
+                                     initargs=(features_path, labels)) as executor:
+                futures = [executor.submit(_fit_fold, estimator, train_index, test_index)
+                           for _, _, _, estimator, train_index, test_index in pending]
+                fitted = [future.result() for future in futures]
+        else:
+            _load_data(features_path, labels)
+            fitted = [_fit_fold(estimator, train_index, test_index)
+                      for _, _, _, estimator, train_index, test_index in pending]
+        print(f'Fitted {len(pending)} folds in {time.perf_counter() - start:.1f} s')
+
+        for (name, fold, path, *_), (estimator, result) in zip(pending, fitted):
+            joblib.dump({'estimator': estimator, 'result': result}, path)
+            rows.append({'model': name, 'fold': fold, 'cached': False, **result})
+
+    fold_table = pd.DataFrame(rows).sort_values(['model', 'fold'], kind='stable').reset_index(drop=True)
+    summary = fold_table.drop(columns=['fold', 'cached']).groupby('model', sort=False).mean()
+    summary['cached_folds'] = fold_table.groupby('model', sort=False)['cached'].sum()
+
+    if output:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        fold_table.to_csv(f'{output}_folds.csv', index=False)
+        summary.to_csv(f'{output}.csv')
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='../raw_data/clean_data.csv')
+    parser.add_argument('--models', nargs='+', default=['logistic_regression', 'random_forest', 'svm'])
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--features', default='../features', help='feature store directory')
+    parser.add_argument('--cache-dir', default='../models/folds')
+    parser.add_argument('--output', default='../models/comparison')
+    args = parser.parse_args()
+
+    summary = compare_models(load(args.data), args.models, n_splits=args.folds, n_jobs=args.n_jobs,
+                             feature_store=FeatureStore(args.features), cache_dir=args.cache_dir,
+                             output=args.output)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summary.round(3))
@@ -0,0 +1,174 @@
+"""Restaurant ratings from predicted review aspects.
+
+``Final_Rating`` from the Experiment_* classifier notebooks scores one CSV of
+reviews at a time. ``score_places`` computes the same scores for any number
+of places. The reviews are classified in one call and then counted per place
+with ``np.bincount``::
+
+    scores = score_places(reviews, classifier)            # one row per place_id
+    results = score_files(files, {'Logistic Regression': classifier_lr})
+
+Scoring rules, as in the notebooks:
+
+* the share of None/Positive/Negative predictions per aspect, in percent
+  rounded to 2 decimals;
+* Positive counts 5, Negative -5 and None ``adjusted_weight``. This is
+  ``-2 * (positive + negative) / none`` when None predictions outnumber the
+  rest, otherwise 0;
+* the weighted sum is rescaled linearly so that all-Negative gives 1 and
+  all-Positive gives 5;
+* the overall score is the mean of the three aspects rounded to 1 decimal.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_loader import load
+from dedup import deduplicate
+
+ASPECTS = ['food', 'service', 'atmosphere']
+
+LABELS = ['None', 'Positive', 'Negative']
+
+WAGES = {'None': 0, 'Positive': 5, 'Negative': -5}
+
+# Linear rescale of the weighted sum onto the 1-5 star range
+SCALE = 4 / (WAGES['Positive'] - WAGES['Negative'])
+OFFSET = 5 - SCALE * WAGES['Positive']
+
+
+def adjusted_weight(none, positive, negative):
+    total = positive + negative
+    if none > total:
+        factor = (total / none) * (-2) if none > -2 else -2
+        return factor
+    return 0
+
+
+def adjusted_weights(none, positive, negative):
+    """``adjusted_weight`` for arrays of percentages."""
+    total = positive + negative
+    weights = np.zeros(np.shape(none))
+    np.divide(-2 * total, none, out=weights, where=none > total)
+    return weights
+
+
+def label_codes(labels):
+    """Index of every label in ``LABELS``; raises on anything else."""
+    codes = pd.Index(LABELS).get_indexer(labels)
+    if (codes < 0).any():
+        unknown = sorted(set(pd.Series(labels)[codes < 0].astype(str)))
+        raise ValueError(f'Unexpected labels {unknown}, expected {LABELS}.')
+    return codes
+
+
+def label_counts(labels, groups, n_groups):
+    """``(n_groups, 3)`` counts of None/Positive/Negative per group."""
+    codes = label_codes(labels)
+    counts = np.bincount(groups * len(LABELS) + codes, minlength=n_groups * len(LABELS))
+    return counts.reshape(n_groups, len(LABELS))
+
+
+def aspect_scores(counts):
+    """Scores of each row of None/Positive/Negative ``counts``."""
+    totals = counts.sum(axis=1, keepdims=True)
+    percent = np.round(counts / totals * 100, 2)
+    none, positive, negative = percent.T
+    weights = adjusted_weights(none, positive, negative)
+    weighted = none * weights + positive * WAGES['Positive'] + negative * WAGES['Negative']
+    return weighted / 100 * SCALE + OFFSET
+
+
+def score_predictions(predictions, groups):
+    """Per-group scores from a frame of predicted labels.
+
+    ``groups`` holds one key per prediction row. The result has food,
+    service, atmosphere, overall and review count columns, indexed by group
+    in order of first appearance.
+    """
+    codes, keys = pd.factorize(pd.Series(groups), sort=False)
+    if (codes < 0).any():
+        raise ValueError('Group keys must not be missing.')
+    scores = pd.DataFrame(index=keys)
+    for aspect in ASPECTS:
+        labels = np.asarray(predictions[aspect], dtype=object)
+        scores[aspect] = aspect_scores(label_counts(labels, codes, len(keys)))
+    scores['overall'] = np.round((scores['food'] + scores['service'] + scores['atmosphere']) / 3, 1)
+    scores['reviews'] = np.bincount(codes, minlength=len(keys))
+    return scores
+
+
+def score_places(reviews, classifier, group_column='place_id', text_column='text', dedup_threshold=None):
+    """Classify all ``reviews`` at once and score every ``group_column`` value.
+
+    With ``dedup_threshold``, near-duplicate reviews of the same place (e.g.
+    re-crawled ones) are counted once; see ``dedup.deduplicate``.
+    """
+    if dedup_threshold is not None:
+        reviews = deduplicate(reviews, text_column, threshold=dedup_threshold, by=group_column)
+    predictions = classifier.predict_frame(reviews[text_column])
+    scores = score_predictions(predictions, reviews[group_column].to_numpy())
+    scores.index.name = group_column
+    return scores
+
+
+def score_files(paths, classifiers, text_column='text', dedup_threshold=None):
+    """The notebooks' evaluation table for review CSVs x classifiers.
+
+    Every file counts as one place, and each classifier predicts all files in
+    a single call. ``dedup_threshold`` drops near-duplicates within each file.
+    """
+    frames = [load(path, columns=[text_column]).assign(File=os.path.basename(path)) for path in paths]
+    reviews = pd.concat(frames, ignore_index=True)
+    if dedup_threshold is not None:
+        reviews = deduplicate(reviews, text_column, threshold=dedup_threshold, by='File')
+
+    results = []
+    for name, classifier in classifiers.items():
+        scores = score_places(reviews, classifier, group_column='File', text_column=text_column)
+        results.append(pd.DataFrame({
+            'File': scores.index,
+            'Classifier': name,
+            'Food_Rating': scores['food'].to_numpy(),
+            'Service_Rating': scores['service'].to_numpy(),
+            'Atmosphere_Rating': scores['atmosphere'].to_numpy(),
+            'Average_Rating': scores['overall'].to_numpy(),
+        }))
+    # Same row order as looping files, then classifiers
+    results = pd.concat(results, ignore_index=True)
+    order = {os.path.basename(path): i for i, path in enumerate(paths)}
+    return results.sort_values('File', key=lambda files: files.map(order), kind='stable').reset_index(drop=True)
+
+
+def Final_Rating(reviews_path, classifier):
+    """Food, service, atmosphere and overall score of one reviews CSV."""
+    test_data = load(reviews_path, columns=['text'])
+    predictions = classifier.predict_frame(test_data['text'])
+    scores = score_predictions(predictions, np.zeros(len(test_data), dtype=np.int64)).iloc[0]
+    return scores['food'], scores['service'], scores['atmosphere'], scores['overall']
+
+
+if __name__ == '__main__':
+    from review_classifier import RestaurantReviewClassifier
+
+    parser = argparse.ArgumentParser(description='Score every place in a reviews CSV with a saved classifier.')
+    parser.add_argument('reviews', help='CSV with the group and text columns')
+    parser.add_argument('--model', required=True, help='artifact directory written by RestaurantReviewClassifier.save')
+    parser.add_argument('--group-column', default='place_id')
+    parser.add_argument('--text-column', default='text')
+    parser.add_argument('--output', help='write the scores to this CSV instead of printing them')
+    parser.add_argument('--dedup', type=float, metavar='JACCARD',
+                        help='count near-duplicate reviews of a place once (e.g. 0.8)')
+    args = parser.parse_args()
+
+    reviews = load(args.reviews, columns=[args.group_column, args.text_column])
+    scores = score_places(reviews, RestaurantReviewClassifier.load(args.model),
+                          group_column=args.group_column, text_column=args.text_column,
+                          dedup_threshold=args.dedup)
+    if args.output:
+        scores.to_csv(args.output)
+    else:
+        print(scores.to_string())
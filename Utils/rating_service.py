@@ -0,0 +1,440 @@
+"""Long-running restaurant scoring with incrementally updated aggregates.
+
+Reviews arrive on a queue, from the crawler output or from POST requests.
+They are classified in micro-batches. Each place keeps a 3x3 table of
+None/Positive/Negative counts per aspect, so a new review costs three
+increments and a score lookup is O(1) no matter how many reviews the place
+has. The scores follow ``rating.py``.
+
+Serve scores for a growing crawl::
+
+    python rating_service.py --model ../models/lr --reviews ../raw_data/reviews_1.csv \\
+        --checkpoint ../raw_data/crawl_state/checkpoint.json --clean --port 8766
+
+    curl localhost:8766/places/ChIJG_KN3PXMHkcR0MY-dNAZ2VQ
+    curl localhost:8766/metrics
+    curl -X POST localhost:8766/reviews -d '[{"place_id": "abc", "text": "great food"}]'
+
+Aggregates live in memory; after a restart the followed output is replayed
+from the beginning.
+"""
+
+import argparse
+import collections
+import csv
+import glob
+import io
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+from rating import ASPECTS, LABELS, aspect_scores, label_codes
+
+ASPECT_ROWS = np.arange(len(ASPECTS))
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+
+class PlaceCounts:
+    """None/Positive/Negative counts per aspect for every place."""
+
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, place_ids, codes):
+        """Count one review per ``place_ids`` entry.
+
+        ``codes`` is an ``(n, 3)`` array of ``LABELS`` indices, one column per
+        aspect.
+        """
+        with self._lock:
+            for place_id, row in zip(place_ids, codes):
+                counts = self.counts.get(place_id)
+                if counts is None:
+                    counts = self.counts[place_id] = np.zeros((len(ASPECTS), len(LABELS)), dtype=np.int64)
+                counts[ASPECT_ROWS, row] += 1
+
+    def score(self, place_id):
+        """Current scores of ``place_id`` or None if it has no reviews."""
+        with self._lock:
+            counts = self.counts.get(place_id)
+            if counts is None:
+                return None
+            counts = counts.copy()
+        scores = aspect_scores(counts)
+        result = {aspect: float(score) for aspect, score in zip(ASPECTS, scores)}
+        result['overall'] = float(np.round((scores[0] + scores[1] + scores[2]) / 3, 1))
+        result['reviews'] = int(counts[0].sum())
+        result['counts'] = {aspect: dict(zip(LABELS, map(int, row))) for aspect, row in zip(ASPECTS, counts)}
+        return result
+
+    def place_ids(self):
+        with self._lock:
+            return list(self.counts)
+
+
+class ServiceMetrics:
+    """Throughput and latency over a sliding window of recent batches."""
+
+    def __init__(self, window=1000):
+        self.started = time.time()
+        self.reviews_scored = 0
+        self.batches = 0
+        self.queries = 0
+        self.errors = 0
+        self.last_error = None
+        self.batch_latency = collections.deque(maxlen=window)
+        self.review_latency = collections.deque(maxlen=window)
+        self.query_latency = collections.deque(maxlen=window)
+        self._recent = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_batch(self, size, seconds, enqueued):
+        now = time.time()
+        with self._lock:
+            self.reviews_scored += size
+            self.batches += 1
+            self.batch_latency.append(seconds)
+            self.review_latency.extend(now - t for t in enqueued)
+            self._recent.append((now, size))
+
+    def record_error(self, error):
+        with self._lock:
+            self.errors += 1
+            self.last_error = f'{type(error).__name__}: {error}'
+
+    def record_query(self, seconds):
+        with self._lock:
+            self.queries += 1
+            self.query_latency.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            recent = list(self._recent)
+            batch_latency = list(self.batch_latency)
+            review_latency = list(self.review_latency)
+            query_latency = list(self.query_latency)
+            totals = {'reviews_scored': self.reviews_scored, 'batches': self.batches, 'queries': self.queries,
+                      'errors': self.errors, 'last_error': self.last_error}
+        uptime = time.time() - self.started
+        window = recent[-1][0] - recent[0][0] if len(recent) > 1 else 0.0
+        return {
+            'uptime_s': uptime,
+            **totals,
+            'reviews_per_s': self.reviews_scored / uptime if uptime else 0.0,
+            'recent_reviews_per_s': sum(size for _, size in recent[1:]) / window if window else None,
+            'batch_latency_ms': {f'p{q}': _ms(percentile(batch_latency, q)) for q in (50, 95, 99)},
+            'review_latency_ms': {f'p{q}': _ms(percentile(review_latency, q)) for q in (50, 95, 99)},
+            'query_latency_ms': {f'p{q}': _ms(percentile(query_latency, q)) for q in (50, 95, 99)},
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+class CsvReviewSource:
+    """New rows of a reviews CSV written by the crawler's ``CsvSink``.
+
+    With ``checkpoint_path`` only rows up to the last crawl checkpoint are
+    read, so a batch that is still being written is never seen half-done.
+    """
+
+    def __init__(self, path, checkpoint_path=None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.header = None
+        self.offset = 0
+
+    def _limit(self):
+        size = os.path.getsize(self.path)
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                return min(size, json.load(f)['sink'].get('reviews', size))
+        return size
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return None
+        limit = self._limit()
+        if limit <= self.offset:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(limit - self.offset)
+        if not self.checkpoint_path:
+            # Without a checkpoint only complete records are safe to read:
+            # cut at the last line break outside a quoted field
+            end = data.rfind(b'\n')
+            while end >= 0 and data.count(b'"', 0, end) % 2:
+                end = data.rfind(b'\n', 0, end)
+            if end < 0:
+                return None
+            data = data[:end + 1]
+        self.offset += len(data)
+
+        rows = list(csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+        if self.header is None:
+            self.header, rows = rows[0], rows[1:]
+        rows = [row for row in rows if row]
+        if not rows:
+            return None
+        return pd.DataFrame(rows, columns=self.header)[['place_id', 'text']]
+
+
+class StoreReviewSource:
+    """New review part files of the crawler's Parquet store.
+
+    Part files appear atomically and carry a growing sequence number, so
+    every poll reads the parts numbered above the last one seen.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.sequence = 0
+
+    def poll(self):
+        import pyarrow.parquet as pq
+        from columnar_store import PART_PATTERN
+
+        paths = glob.glob(os.path.join(self.root, 'reviews', '*', '*', 'part-*.parquet'))
+        parts = sorted((int(PART_PATTERN.search(path).group(1)), path) for path in paths)
+        new_parts = [(number, path) for number, path in parts if number > self.sequence]
+        if not new_parts:
+            return None
+        self.sequence = new_parts[-1][0]
+        return pd.concat([pq.read_table(path, columns=['place_id', 'text']).to_pandas()
+                          for _, path in new_parts], ignore_index=True)
+
+
+class RatingService:
+    """Classifies queued reviews in micro-batches and keeps per-place scores.
+
+    A batch is sent to the classifier once ``batch_size`` reviews are queued
+    or ``max_wait`` seconds after its first review arrived. ``cleaner`` maps
+    a list of raw texts to cleaned ones (e.g. ``clean_data_batch``) for
+    sources that hold raw review text.
+    """
+
+    def __init__(self, classifier, batch_size=256, max_wait=0.2, cleaner=None, queue_size=100000):
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.cleaner = cleaner
+        self.places = PlaceCounts()
+        self.metrics = ServiceMetrics()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def submit(self, place_id, text):
+        self._queue.put((place_id, text, time.time()))
+
+    def submit_many(self, reviews):
+        """Queue ``(place_id, text)`` pairs."""
+        for place_id, text in reviews:
+            self.submit(place_id, text)
+
+    def score(self, place_id):
+        return self.places.score(place_id)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def process(self, batch):
+        """Classify ``(place_id, text, enqueued_at)`` tuples and count them.
+
+        Raises ValueError if the classifier returns a label outside ``LABELS``;
+        nothing of the batch is counted then.
+        """
+        start = time.perf_counter()
+        place_ids, texts, enqueued = zip(*batch)
+        texts = list(texts)
+        if self.cleaner is not None:
+            texts = list(self.cleaner(texts))
+        predictions = self.classifier.predict_frame(texts)
+        codes = np.column_stack([label_codes(predictions[aspect]) for aspect in ASPECTS])
+        self.places.add(place_ids, codes)
+        self.metrics.record_batch(len(batch), time.perf_counter() - start, enqueued)
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.process(batch)
+            except Exception as error:
+                # Drop the batch but keep serving; the error shows up in /metrics
+                print(f'Scoring a batch of {len(batch)} reviews failed: {error!r}')
+                self.metrics.record_error(error)
+
+    def _follow(self, source, poll_interval):
+        while not self._stop.is_set():
+            try:
+                reviews = source.poll()
+            except Exception as error:
+                print(f'Reading new reviews failed: {error!r}')
+                self.metrics.record_error(error)
+                reviews = None
+            if reviews is not None:
+                self.submit_many(zip(reviews['place_id'], reviews['text']))
+            else:
+                self._stop.wait(poll_interval)
+
+    def start(self):
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def follow(self, source, poll_interval=1.0):
+        """Feed new reviews from ``source.poll()`` into the queue."""
+        thread = threading.Thread(target=self._follow, args=(source, poll_interval), daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Score whatever is still queued and stop all threads."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+class RatingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, address=('127.0.0.1', 8766)):
+        super().__init__(address, RatingHandler)
+        self.service = service
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a background thread; returns the thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class RatingHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        start = time.perf_counter()
+        service = self.server.service
+        path = urlparse(self.path).path.rstrip('/')
+
+        if path.startswith('/places/'):
+            place_id = unquote(path[len('/places/'):])
+            score = service.score(place_id)
+            if score is None:
+                self._send(404, {'error': f'no reviews for {place_id}'})
+            else:
+                self._send(200, {'place_id': place_id, **score})
+        elif path == '/places':
+            self._send(200, {'places': service.places.place_ids()})
+        elif path == '/metrics':
+            self._send(200, {**service.metrics.snapshot(),
+                             'queue_depth': service.queue_depth(),
+                             'places': len(service.places)})
+        else:
+            self._send(404, {'error': 'not found'})
+        service.metrics.record_query(time.perf_counter() - start)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/reviews':
+            self._send(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            reviews = json.loads(self.rfile.read(length))
+            if isinstance(reviews, dict):
+                reviews = [reviews]
+            pairs = [(review['place_id'], review['text']) for review in reviews]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {'error': f'expected a list of {{"place_id", "text"}} objects: {e}'})
+            return
+        self.server.service.submit_many(pairs)
+        self._send(202, {'queued': len(pairs)})
+
+
+if __name__ == '__main__':
+    from review_classifier import RestaurantReviewClassifier
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', required=True, help='artifact directory written by RestaurantReviewClassifier.save')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--reviews', help='reviews CSV to follow')
+    source.add_argument('--store', help='Parquet store root to follow')
+    parser.add_argument('--checkpoint', help="crawl checkpoint.json bounding what is read from --reviews")
+    parser.add_argument('--clean', action='store_true', help='clean raw texts with clean_data_batch first')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-wait', type=float, default=0.2)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    cleaner = None
+    if args.clean:
+        from cleansed_data import clean_data_batch as cleaner
+
+    service = RatingService(RestaurantReviewClassifier.load(args.model), batch_size=args.batch_size,
+                            max_wait=args.max_wait, cleaner=cleaner).start()
+    if args.reviews:
+        service.follow(CsvReviewSource(args.reviews, args.checkpoint), args.poll_interval)
+    elif args.store:
+        service.follow(StoreReviewSource(args.store), args.poll_interval)
+
+    server = RatingServer(service, (args.host, args.port))
+    print(f'Serving restaurant scores on {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        service.stop()
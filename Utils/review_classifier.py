@@ -0,0 +1,319 @@
+"""RestaurantReviewClassifier from the Experiment_* classifier notebooks.
+
+Predicts the food / service / atmosphere sentiment of review texts. A trained
+classifier can be saved to a versioned artifact directory and loaded again
+without retraining::
+
+    classifier = RestaurantReviewClassifier(model='logistic_regression')
+    classifier.train(df)
+    classifier.save('../models/lr')
+
+    classifier = RestaurantReviewClassifier.load('../models/lr')
+    classifier.predict(texts)
+
+The artifact holds a ``manifest.json``, the vectorizer settings and
+vocabulary, the IDF weights and label classes as ``.npy`` files and the
+estimators as an uncompressed joblib file whose arrays are memory-mapped on
+load. Classifiers built on ``features.HashingTfidf`` store its document
+frequencies instead of a vocabulary.
+"""
+
+import datetime
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder
+from sklearn.svm import SVC, LinearSVC
+
+from dedup import deduplicate
+from features import HashingTfidf
+from joint_model import JointAspectClassifier
+
+ASPECTS = ['food', 'service', 'atmosphere']
+
+# Bump when the artifact layout changes
+ARTIFACT_VERSION = 1
+
+VECTORIZER_PARAMS = ['stop_words', 'max_features', 'ngram_range', 'lowercase',
+                     'token_pattern', 'sublinear_tf', 'norm', 'use_idf', 'smooth_idf']
+
+
+def base_classifier(model):
+    """Unfitted per-aspect estimator for a ``model`` name."""
+    if model == 'logistic_regression':
+        return LogisticRegression(max_iter=1000)
+    elif model == 'random_forest':
+        return RandomForestClassifier(n_estimators=100, random_state=42)
+    elif model == 'svm':
+        return SVC(probability=True, kernel='linear')
+    elif model == 'linear_svc':
+        # Linear time in the number of reviews; probabilities via Platt scaling
+        return CalibratedClassifierCV(LinearSVC(), cv=3)
+    elif model == 'sgd':
+        # Logistic loss gives probabilities directly and supports partial_fit
+        return SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+    else:
+        raise ValueError("Model not supported. Choose from 'logistic_regression', 'random_forest', 'svm', "
+                         "'linear_svc', 'sgd', 'joint'.")
+
+
+class RestaurantReviewClassifier:
+    def __init__(self, model='logistic_regression', vectorizer=None):
+        self.model = model
+        # Any features.py vectorizer, e.g. HashingTfidf(); TF-IDF by default
+        self.tfidf_vectorizer = vectorizer if vectorizer is not None else TfidfVectorizer(
+            stop_words='english',
+            max_features=5000,
+            ngram_range=(1, 2)
+        )
+        self.label_encoders = {
+            'food': LabelEncoder(),
+            'service': LabelEncoder(),
+            'atmosphere': LabelEncoder()
+        }
+
+        # Initialize classifier based on input model; 'joint' fits all
+        # three aspects with one shared weight matrix
+        if model == 'joint':
+            self.classifier = JointAspectClassifier()
+        else:
+            self.classifier = MultiOutputClassifier(base_classifier(model))
+
+    def preprocess_data(self, df):
+        # Drop rows with NaN in text column
+        df = df.dropna(subset=['text'])
+
+        # Fill NaN in categorical columns with 'None'
+        columns = ['food', 'service', 'atmosphere']
+        for col in columns:
+            if col not in df.columns:
+                df[col] = 'None'
+            df.loc[:, col] = df[col].fillna('None')
+
+        return df
+
+    def train(self, df, feature_store=None, dedup_threshold=None):
+        # Preprocess data
+        df = self.preprocess_data(df)
+
+        # Drop near-duplicate reviews (Jaccard >= dedup_threshold) so repeated
+        # crawls and augmentation templates are not fitted several times.
+        # Only reviews with the same food/service/atmosphere labels count as
+        # duplicates: an Experiment 3 review with an injected comment is
+        # nearly identical to the original but teaches a different label.
+        if dedup_threshold is not None:
+            n_rows = len(df)
+            df = deduplicate(df, threshold=dedup_threshold, by=ASPECTS)
+            print(f"Removed {n_rows - len(df)} near-duplicate reviews")
+
+        # Vectorize text, reusing a cached featurization when a
+        # features.FeatureStore is given
+        if feature_store is not None:
+            X, self.tfidf_vectorizer = feature_store.featurize(df['text'].astype(str), self.tfidf_vectorizer)
+        else:
+            X = self.tfidf_vectorizer.fit_transform(df['text'].astype(str))
+
+        # Encode labels dynamically
+        y_dict = {}
+        for col in ['food', 'service', 'atmosphere']:
+            unique_labels = df[col].unique()
+            self.label_encoders[col].fit(unique_labels)
+            y_dict[col] = self.label_encoders[col].transform(df[col])
+
+        y = pd.DataFrame(y_dict)
+
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
+
+        # Train classifier
+        self.classifier.fit(X_train, y_train)
+
+        # Predict
+        y_pred = self.classifier.predict(X_test)
+
+        # Evaluate
+        self._report(y_test, y_pred)
+
+    def _report(self, y_test, y_pred):
+        y_test = np.asarray(y_test)
+        print("\nModel Performance Metrics:")
+        for i, col in enumerate(['food', 'service', 'atmosphere']):
+            print(f"\n{col.capitalize()} Classification:")
+            classes = self.label_encoders[col].classes_
+
+            accuracy = accuracy_score(y_test[:, i], y_pred[:, i])
+            print(f"Accuracy: {accuracy:.2%}")
+
+            print(classification_report(
+                y_test[:, i],
+                y_pred[:, i],
+                labels=range(len(classes)),
+                target_names=classes
+            ))
+
+    def train_out_of_core(self, chunks, chunk_size=50000, test_size=0.2, epochs=1):
+        """Train with ``partial_fit`` on data that does not fit in memory.
+
+        ``chunks`` is a CSV path or a callable returning an iterable of
+        DataFrames; it is read ``epochs + 1`` times. The first pass estimates
+        the IDF and collects the labels, and every further pass feeds each
+        chunk to the model once. A ``test_size`` share of every chunk is held
+        out and scored like in ``train``. This needs a stateless vectorizer
+        (``features.HashingTfidf``) and a model with ``partial_fit`` ('sgd').
+        """
+        if not isinstance(self.tfidf_vectorizer, HashingTfidf):
+            raise ValueError("Out-of-core training needs vectorizer=HashingTfidf().")
+        if not hasattr(getattr(self.classifier, 'estimator', None), 'partial_fit'):
+            raise ValueError(f"Model '{self.model}' has no partial_fit; use model='sgd'.")
+        if isinstance(chunks, str):
+            path = chunks
+            chunks = lambda: pd.read_csv(path, chunksize=chunk_size)
+
+        def split(chunk, seed):
+            chunk = self.preprocess_data(chunk)
+            held_out = np.random.default_rng(seed).random(len(chunk)) < test_size
+            return chunk, held_out
+
+        labels = {col: set() for col in ASPECTS}
+        self.tfidf_vectorizer.fit([])
+        for i, chunk in enumerate(chunks()):
+            chunk, held_out = split(chunk, i)
+            self.tfidf_vectorizer.partial_fit(chunk['text'].astype(str)[~held_out])
+            for col in ASPECTS:
+                labels[col].update(chunk[col])
+        for col in ASPECTS:
+            self.label_encoders[col].fit(sorted(labels[col]))
+        classes = [np.arange(len(self.label_encoders[col].classes_)) for col in ASPECTS]
+
+        for epoch in range(epochs):
+            y_test, y_pred = [], []
+            for i, chunk in enumerate(chunks()):
+                chunk, held_out = split(chunk, i)
+                X = self.tfidf_vectorizer.transform(chunk['text'].astype(str))
+                y = np.column_stack([self.label_encoders[col].transform(chunk[col]) for col in ASPECTS])
+                if (~held_out).any():
+                    self.classifier.partial_fit(X[~held_out], y[~held_out], classes=classes)
+                if epoch == epochs - 1 and held_out.any():
+                    y_test.append(y[held_out])
+                    y_pred.append(self.classifier.predict(X[held_out]))
+
+        if y_test:
+            self._report(np.vstack(y_test), np.vstack(y_pred))
+
+    def _vectorize(self, texts):
+        # Convert texts to strings and handle potential NaN
+        texts = [str(text) if pd.notna(text) else '' for text in texts]
+        return self.tfidf_vectorizer.transform(texts)
+
+    def predict_frame(self, texts, return_proba=False):
+        """Predictions as a DataFrame with one categorical column per aspect.
+
+        Each aspect is decoded with a single array lookup. With
+        ``return_proba`` a ``<aspect>_<label>`` probability column is added
+        for every class.
+        """
+        X = self._vectorize(texts)
+        frame = self.decode_labels(self.classifier.predict(X))
+        if not return_proba:
+            return frame
+
+        columns = {}
+        for col, proba in zip(ASPECTS, self.classifier.predict_proba(X)):
+            for j, label in enumerate(self.label_encoders[col].classes_):
+                columns[f'{col}_{label}'] = proba[:, j]
+        return pd.concat([frame, pd.DataFrame(columns)], axis=1)
+
+    def decode_labels(self, codes):
+        """``(n, 3)`` encoded predictions as a DataFrame of categorical aspect columns."""
+        return pd.DataFrame({
+            col: pd.Categorical.from_codes(codes[:, i].astype(np.int64), categories=self.label_encoders[col].classes_)
+            for i, col in enumerate(ASPECTS)
+        })
+
+    def predict(self, texts):
+        """List of ``{aspect: label}`` dicts, one per text."""
+        return self.predict_frame(texts)[ASPECTS].astype(object).to_dict('records')
+
+    def save(self, path):
+        """Write the fitted classifier to the artifact directory ``path``."""
+        os.makedirs(path, exist_ok=True)
+        params = self.tfidf_vectorizer.get_params()
+        if isinstance(self.tfidf_vectorizer, HashingTfidf):
+            features = 'hashing'
+            vectorizer = dict(params, n_documents=int(self.tfidf_vectorizer.n_documents_))
+            np.save(os.path.join(path, 'document_frequency.npy'), self.tfidf_vectorizer.document_frequency_)
+        else:
+            features = 'tfidf'
+            vectorizer = {name: params[name] for name in VECTORIZER_PARAMS}
+            vectorizer['vocabulary'] = {term: int(i) for term, i in self.tfidf_vectorizer.vocabulary_.items()}
+            np.save(os.path.join(path, 'idf.npy'), self.tfidf_vectorizer.idf_)
+        with open(os.path.join(path, 'vectorizer.json'), 'w', encoding='utf-8') as f:
+            json.dump(vectorizer, f, ensure_ascii=False)
+
+        for col in ASPECTS:
+            np.save(os.path.join(path, f'classes_{col}.npy'), self.label_encoders[col].classes_.astype(str))
+
+        # Uncompressed so that load() can memory-map the coefficient arrays
+        joblib.dump(self.classifier, os.path.join(path, 'classifier.joblib'))
+
+        manifest = {
+            'artifact_version': ARTIFACT_VERSION,
+            'model': self.model,
+            'features': features,
+            'aspects': ASPECTS,
+            'sklearn_version': sklearn.__version__,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a classifier written by :meth:`save`; no retraining needed."""
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['artifact_version'] != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported artifact version {manifest['artifact_version']}, "
+                             f"expected {ARTIFACT_VERSION}.")
+        if manifest['sklearn_version'] != sklearn.__version__:
+            print(f"Warning: artifact saved with scikit-learn {manifest['sklearn_version']}, "
+                  f"running {sklearn.__version__}.")
+
+        self = cls.__new__(cls)
+        self.model = manifest['model']
+
+        with open(os.path.join(path, 'vectorizer.json'), encoding='utf-8') as f:
+            vectorizer = json.load(f)
+        vectorizer['ngram_range'] = tuple(vectorizer['ngram_range'])
+        if manifest.get('features', 'tfidf') == 'hashing':
+            n_documents = vectorizer.pop('n_documents')
+            self.tfidf_vectorizer = HashingTfidf(**vectorizer)
+            self.tfidf_vectorizer.n_documents_ = n_documents
+            self.tfidf_vectorizer.document_frequency_ = np.load(os.path.join(path, 'document_frequency.npy'))
+        else:
+            vocabulary = vectorizer.pop('vocabulary')
+            self.tfidf_vectorizer = TfidfVectorizer(**vectorizer)
+            self.tfidf_vectorizer.vocabulary_ = vocabulary
+            self.tfidf_vectorizer.idf_ = np.load(os.path.join(path, 'idf.npy'))
+
+        self.label_encoders = {}
+        for col in manifest['aspects']:
+            encoder = LabelEncoder()
+            encoder.classes_ = np.load(os.path.join(path, f'classes_{col}.npy')).astype(object)
+            self.label_encoders[col] = encoder
+
+        self.classifier = joblib.load(os.path.join(path, 'classifier.joblib'), mmap_mode=mmap_mode)
+        return self
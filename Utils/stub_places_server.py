@@ -0,0 +1,144 @@
+"""Local stand-in for the Google Places API.
+
+Replays the responses stored in ``API_response_template/`` so the crawler can
+be exercised offline. Every Nearby Search returns ``results_per_query`` places
+whose ids are derived from the rounded query location, so nearby queries
+overlap just like the real API. Results come in pages of 20 linked by
+``next_page_token``. ``failure_rate`` makes a share of the calls
+answer with HTTP 503 or ``OVER_QUERY_LIMIT`` to exercise the retry logic, and
+Place Details for the ids in ``unavailable_places`` always answer HTTP 503.
+
+Run it with ``python stub_places_server.py --port 8765`` and crawl with
+``PlacesCrawler(api_key, base_url='http://127.0.0.1:8765')``.
+"""
+
+import argparse
+import ast
+import copy
+import json
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 20
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'API_response_template')
+
+
+def load_template(name):
+    """Load a template; some of them are Python reprs rather than JSON."""
+    with open(os.path.join(TEMPLATE_DIR, name), encoding='utf-8') as f:
+        content = f.read()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return ast.literal_eval(content)
+
+
+class StubPlacesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), results_per_query=20,
+                 failure_rate=0.0, seed=0, unavailable_places=()):
+        super().__init__(address, StubPlacesHandler)
+        self.place = load_template('places.json')
+        self.details = load_template('places_details.json')
+        self.results_per_query = results_per_query
+        self.failure_rate = failure_rate
+        self.unavailable_places = set(unavailable_places)
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a background thread; returns the thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def should_fail(self):
+        with self._lock:
+            self.request_count += 1
+            return self.random.random() < self.failure_rate
+
+    def nearby_page(self, location, page=0):
+        """One page of results and the token of the next page (or None)."""
+        lat, lng = (round(float(v), 2) for v in location.split(','))
+        first = page * PAGE_SIZE
+        last = min(first + PAGE_SIZE, self.results_per_query)
+        results = []
+        for i in range(first, last):
+            place = copy.deepcopy(self.place)
+            place['place_id'] = f"{self.place['place_id']}_{lat}_{lng}_{i}"
+            place['geometry']['location'] = {'lat': lat, 'lng': lng}
+            results.append(place)
+        next_page_token = f'{location}|{page + 1}' if last < self.results_per_query else None
+        return results, next_page_token
+
+    def place_details(self, place_id):
+        details = copy.deepcopy(self.details)
+        details['place_id'] = place_id
+        return details
+
+
+class StubPlacesHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if self.server.should_fail():
+            if self.server.random.random() < 0.5:
+                self._send(503, {'status': 'UNKNOWN_ERROR'})
+            else:
+                self._send(200, {'status': 'OVER_QUERY_LIMIT', 'results': []})
+            return
+
+        if url.path.endswith('/nearbysearch/json'):
+            if 'pagetoken' in params:
+                location, page = params['pagetoken'].rsplit('|', 1)
+                results, token = self.server.nearby_page(location, int(page))
+            else:
+                results, token = self.server.nearby_page(params['location'])
+            payload = {'status': 'OK', 'results': results}
+            if token:
+                payload['next_page_token'] = token
+            self._send(200, payload)
+        elif url.path.endswith('/details/json'):
+            if params['place_id'] in self.server.unavailable_places:
+                self._send(503, {'status': 'UNKNOWN_ERROR'})
+                return
+            self._send(200, {'status': 'OK', 'result': self.server.place_details(params['place_id'])})
+        else:
+            self._send(404, {'status': 'NOT_FOUND'})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--results-per-query', type=int, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubPlacesServer((args.host, args.port), args.results_per_query, args.failure_rate)
+    print(f'Serving stub Places API on {server.base_url}')
+    server.serve_forever()
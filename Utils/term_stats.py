@@ -0,0 +1,340 @@
+"""Per-slice n-gram statistics for the EDA word clouds, TF-IDF and chi2 tables.
+
+The EDA notebooks used to re-tokenize every review for each word cloud,
+TF-IDF ranking and chi2 table. ``TermStats`` counts the n-grams once per
+*cell*. A cell is one combination of ``rating`` and the three aspect
+sentiments. A slice such as ``food == 'Positive'`` or ``rating == 1`` is the
+sum over its matching cells, so it is answered from the count tables
+without rescanning the text:
+
+* ``frequencies`` - term counts, the input of ``WordCloud.generate_from_frequencies``
+* ``tfidf`` - term count times the corpus IDF of ``TfidfVectorizer``, L2-normalised
+* ``chi2`` - the ``sklearn.feature_selection.chi2`` score on term-count features
+
+``update`` adds new reviews. ``merge`` adds the statistics of another corpus,
+for example a later crawl or a chunk counted in another process. The count
+tables are exact by default. With ``sketch_width`` set, counts go into
+fixed-size count-min sketches and each cell only remembers its
+``candidates`` most frequent terms. Memory then stays bounded on big
+corpora, at the price of slightly overestimated counts::
+
+    stats = TermStats.from_frame(df, ngram_range=(1, 3))
+    WordCloud().generate_from_frequencies(stats.frequencies(ngram=1, stop_words=STOPWORDS, food='Positive'))
+    stats.chi2('service', 'Negative', n=5, ngram=2)
+    stats.update(new_reviews)
+"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.utils import murmurhash3_32
+
+CELL_COLUMNS = ['rating', 'food', 'service', 'atmosphere']
+
+# Mersenne prime for the count-min hash family
+_PRIME = np.uint64(2 ** 31 - 1)
+
+
+def preprocess_text(text):
+    """Lowercased alphabetic words, as in the EDA notebooks."""
+    return ' '.join(word.lower() for word in str(text).split() if word.isalpha())
+
+
+def _cell_value(value):
+    if pd.isna(value):
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _term_hashes(terms):
+    return np.fromiter((murmurhash3_32(term, positive=True) for term in terms), dtype=np.uint64, count=len(terms))
+
+
+def _resize(matrix, shape):
+    """Pad a CSR matrix with empty rows and columns."""
+    indptr = np.concatenate([matrix.indptr, np.full(shape[0] - matrix.shape[0], matrix.indptr[-1])])
+    return sp.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+
+
+class CountMinSketch:
+    """Count-min sketch over integer keys; merging two sketches adds the tables."""
+
+    def __init__(self, width=2 ** 20, depth=4, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), depth).astype(np.uint64)
+        self._b = rng.integers(0, int(_PRIME), depth).astype(np.uint64)
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _index(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64) % _PRIME
+        return ((self._a[:, None] * keys + self._b[:, None]) % _PRIME) % np.uint64(self.width)
+
+    def add(self, keys, counts):
+        index = self._index(keys)
+        for row in range(self.depth):
+            np.add.at(self.table[row], index[row], counts)
+
+    def query(self, keys):
+        index = self._index(keys)
+        return self.table[np.arange(self.depth)[:, None], index].min(axis=0)
+
+    def merge(self, other):
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError('Only sketches with the same width, depth and seed can be merged')
+        self.table += other.table
+        return self
+
+
+class TermStats:
+    """Mergeable n-gram counts per (rating, food, service, atmosphere) cell.
+
+    For every cell it keeps the number of reviews, the term frequency (all
+    occurrences) and the document frequency of each n-gram. Slices are
+    selected with keyword filters on ``CELL_COLUMNS``, e.g.
+    ``stats.frequencies(rating=1)``. Without filters the whole corpus is used.
+    """
+
+    def __init__(self, ngram_range=(1, 3), sketch_width=None, sketch_depth=4, candidates=2000):
+        self.ngram_range = tuple(ngram_range)
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.candidates = candidates
+        self.cells = []
+        self._rows = {}
+        self.n_docs = np.zeros(0, dtype=np.int64)
+        if sketch_width is None:
+            self.vocabulary = {}
+            self.terms = []
+            self.tf = sp.csr_matrix((0, 0), dtype=np.int64)
+            self.df = sp.csr_matrix((0, 0), dtype=np.int64)
+        else:
+            self.tf_sketch = CountMinSketch(sketch_width, sketch_depth)
+            self.df_sketch = CountMinSketch(sketch_width, sketch_depth, seed=1)
+            self.cell_terms = []
+
+    @classmethod
+    def from_frame(cls, df, text_column='text', **kwargs):
+        return cls(**kwargs).update(df, text_column)
+
+    def _row(self, cell):
+        row = self._rows.get(cell)
+        if row is None:
+            row = self._rows[cell] = len(self.cells)
+            self.cells.append(cell)
+            self.n_docs = np.append(self.n_docs, 0)
+            if self.sketch_width is not None:
+                self.cell_terms.append({})
+        return row
+
+    def _cell_keys(self, row, term_hashes):
+        cell_hash = murmurhash3_32(repr(self.cells[row]), positive=True)
+        return term_hashes * np.uint64(1000003) + np.uint64(cell_hash)
+
+    # -- counting ---------------------------------------------------------
+
+    def update(self, df, text_column='text', batch_size=10000):
+        """Count the n-grams of ``df[text_column]``; the label columns pick the cell."""
+        for start in range(0, len(df), batch_size):
+            self._update_batch(df.iloc[start:start + batch_size], text_column)
+        return self
+
+    def _update_batch(self, df, text_column):
+        columns = [df[column] if column in df else pd.Series(None, index=df.index) for column in CELL_COLUMNS]
+        rows = np.array([self._row(tuple(_cell_value(value) for value in cell)) for cell in zip(*columns)],
+                        dtype=np.int64)
+        self.n_docs += np.bincount(rows, minlength=len(self.cells))
+
+        vectorizer = CountVectorizer(preprocessor=preprocess_text, tokenizer=str.split, token_pattern=None,
+                                     lowercase=False, ngram_range=self.ngram_range, dtype=np.int64)
+        try:
+            X = vectorizer.fit_transform(df[text_column].fillna(''))
+        except ValueError:  # no n-grams at all in this batch
+            return
+        membership = sp.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, np.arange(len(rows)))),
+                                   shape=(len(self.cells), len(rows)))
+        tf = (membership @ X).tocsr()
+        df_counts = (membership @ (X > 0).astype(np.int64)).tocsr()
+        # Same sparsity pattern, so sorted indices line the data arrays up
+        tf.sort_indices()
+        df_counts.sort_indices()
+        terms = vectorizer.get_feature_names_out()
+        if self.sketch_width is None:
+            self._add_exact(tf, df_counts, terms)
+        else:
+            self._add_sketch(tf, df_counts, terms)
+
+    def _add_exact(self, tf, df_counts, terms):
+        columns = np.empty(len(terms), dtype=np.int64)
+        for i, term in enumerate(terms):
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = self.vocabulary[term] = len(self.terms)
+                self.terms.append(term)
+            columns[i] = column
+        shape = (len(self.cells), len(self.terms))
+        for name, batch in (('tf', tf), ('df', df_counts)):
+            batch = sp.csr_matrix((batch.data, columns[batch.indices], batch.indptr), shape=shape)
+            setattr(self, name, _resize(getattr(self, name), shape) + batch)
+
+    def _add_sketch(self, tf, df_counts, terms):
+        hashes = _term_hashes(terms)
+        for row in np.flatnonzero(np.diff(tf.indptr)):
+            columns = tf.indices[tf.indptr[row]:tf.indptr[row + 1]]
+            keys = self._cell_keys(row, hashes[columns])
+            self.tf_sketch.add(keys, tf.data[tf.indptr[row]:tf.indptr[row + 1]])
+            self.df_sketch.add(keys, df_counts.data[df_counts.indptr[row]:df_counts.indptr[row + 1]])
+            self.cell_terms[row].update(zip(terms[columns], hashes[columns]))
+            self._prune(row)
+
+    def _prune(self, row):
+        """Keep the ``candidates`` terms of a cell with the highest estimated counts."""
+        cell_terms = self.cell_terms[row]
+        if len(cell_terms) <= self.candidates:
+            return
+        terms = np.array(list(cell_terms))
+        hashes = np.fromiter(cell_terms.values(), dtype=np.uint64, count=len(terms))
+        estimates = self.tf_sketch.query(self._cell_keys(row, hashes))
+        keep = np.argsort(-estimates, kind='stable')[:self.candidates]
+        self.cell_terms[row] = dict(zip(terms[keep], hashes[keep]))
+
+    def merge(self, other):
+        """Add the counts of another ``TermStats`` built with the same settings."""
+        settings = ('ngram_range', 'sketch_width', 'sketch_depth')
+        if any(getattr(self, name) != getattr(other, name) for name in settings):
+            raise ValueError(f'Only TermStats with the same {", ".join(settings)} can be merged')
+        rows = np.array([self._row(cell) for cell in other.cells], dtype=np.int64)
+        self.n_docs[rows] += other.n_docs
+        if self.sketch_width is None:
+            # Reorder the other tables onto our cell rows, then add them like a batch
+            mapping = sp.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, np.arange(len(rows)))),
+                                    shape=(len(self.cells), len(rows)))
+            self._add_exact((mapping @ other.tf).tocsr(), (mapping @ other.df).tocsr(), other.terms)
+        else:
+            self.tf_sketch.merge(other.tf_sketch)
+            self.df_sketch.merge(other.df_sketch)
+            for row, cell_terms in zip(rows, other.cell_terms):
+                self.cell_terms[row].update(cell_terms)
+                self._prune(row)
+        return self
+
+    # -- queries ----------------------------------------------------------
+
+    def _select(self, where):
+        unknown = set(where) - set(CELL_COLUMNS)
+        if unknown:
+            raise ValueError(f'Unknown slice columns {sorted(unknown)}; use {CELL_COLUMNS}')
+        positions = [CELL_COLUMNS.index(column) for column in where]
+        values = [_cell_value(value) for value in where.values()]
+        return np.array([row for row, cell in enumerate(self.cells)
+                         if all(cell[i] == value for i, value in zip(positions, values))], dtype=np.int64)
+
+    def _counts(self, rows, terms=None):
+        """Summed (terms, tf, df) of ``rows``; every term seen in them unless ``terms`` is given."""
+        if self.sketch_width is None:
+            tf = np.asarray(self.tf[rows].sum(axis=0)).ravel()
+            df_counts = np.asarray(self.df[rows].sum(axis=0)).ravel()
+            if terms is None:
+                columns = np.flatnonzero(tf)
+                return np.asarray(self.terms, dtype=object)[columns], tf[columns], df_counts[columns]
+            columns = np.array([self.vocabulary.get(term, -1) for term in terms], dtype=np.int64)
+            known = columns >= 0
+            tf_out = np.zeros(len(terms), dtype=np.int64)
+            df_out = np.zeros(len(terms), dtype=np.int64)
+            tf_out[known], df_out[known] = tf[columns[known]], df_counts[columns[known]]
+            return np.asarray(terms, dtype=object), tf_out, df_out
+
+        if terms is None:
+            candidates = {}
+            for row in rows:
+                candidates.update(self.cell_terms[row])
+            terms, hashes = list(candidates), np.fromiter(candidates.values(), dtype=np.uint64, count=len(candidates))
+        else:
+            hashes = _term_hashes(terms)
+        tf = np.zeros(len(terms), dtype=np.int64)
+        df_counts = np.zeros(len(terms), dtype=np.int64)
+        for row in rows:
+            keys = self._cell_keys(row, hashes)
+            tf += self.tf_sketch.query(keys)
+            df_counts += self.df_sketch.query(keys)
+        # df can never exceed the number of reviews in the slice
+        df_counts = np.minimum(df_counts, self.n_docs[rows].sum())
+        return np.asarray(terms, dtype=object), tf, df_counts
+
+    @staticmethod
+    def _filter(terms, ngram, stop_words):
+        lengths = np.array([term.count(' ') + 1 for term in terms], dtype=np.int64)
+        keep = np.ones(len(terms), dtype=bool) if ngram is None else lengths == ngram
+        if stop_words:
+            stop_words = set(stop_words)
+            keep &= np.array([stop_words.isdisjoint(term.split()) for term in terms], dtype=bool)
+        return keep
+
+    def n_documents(self, **where):
+        return int(self.n_docs[self._select(where)].sum())
+
+    def frequencies(self, n=200, ngram=None, stop_words=None, **where):
+        """The ``n`` most frequent terms of a slice as a ``{term: count}`` dict.
+
+        ``ngram`` keeps only terms of that many words, ``stop_words`` drops
+        terms containing any of them (pass ``wordcloud.STOPWORDS`` for the
+        word clouds).
+        """
+        terms, tf, _ = self._counts(self._select(where))
+        keep = self._filter(terms, ngram, stop_words)
+        counts = pd.Series(tf[keep], index=terms[keep], dtype=np.int64)
+        return counts.sort_values(ascending=False, kind='stable').head(n).to_dict()
+
+    def tfidf(self, n=10, ngram=None, stop_words=None, **where):
+        """Top ``n`` terms of a slice by count times corpus IDF.
+
+        The IDF is ``TfidfVectorizer``'s smoothed ``ln((1 + N) / (1 + df)) + 1``
+        over all reviews, and the weights are L2-normalised over the slice.
+        Per-review normalisation is not recoverable from counts, so this is
+        the class-level TF-IDF of the slice rather than a sum of row vectors.
+        """
+        terms, tf, _ = self._counts(self._select(where))
+        keep = self._filter(terms, ngram, stop_words)
+        terms, tf = terms[keep], tf[keep]
+        _, _, df_all = self._counts(np.arange(len(self.cells)), terms)
+        weights = tf * (np.log((1 + self.n_docs.sum()) / (1 + df_all)) + 1)
+        norm = np.linalg.norm(weights)
+        weights = pd.Series(weights / norm if norm else weights, index=terms)
+        return weights.sort_values(ascending=False, kind='stable').head(n)
+
+    def chi2(self, column, value, n=None, ngram=None, stop_words=None, **where):
+        """chi2 of each term for ``column == value`` vs the rest of the slice.
+
+        Equals ``sklearn.feature_selection.chi2(X, y == value)`` with ``X`` the
+        n-gram counts of the reviews in the slice, so every term of the slice
+        is scored, including terms that never occur with ``value``. Returns a
+        Series sorted by score, strongest first.
+        """
+        rows = self._select(where)
+        inside = rows[np.isin(rows, self._select({**where, column: value}))]
+        terms, tf_all, _ = self._counts(rows)
+        keep = self._filter(terms, ngram, stop_words)
+        terms, tf_all = terms[keep], tf_all[keep]
+        _, tf_in, _ = self._counts(inside, terms)
+        n_in, n_all = self.n_docs[inside].sum(), self.n_docs[rows].sum()
+        observed = np.vstack([tf_in, tf_all - tf_in]).astype(float)
+        expected = np.outer([n_in / n_all, (n_all - n_in) / n_all], tf_all)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = ((observed - expected) ** 2 / expected).sum(axis=0)
+        scores = pd.Series(scores, index=terms).sort_values(ascending=False, kind='stable')
+        return scores if n is None else scores.head(n)
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
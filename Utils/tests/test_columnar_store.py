@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+from columnar_store import ParquetSink, import_csv, read_table
+from crawl_state import CrawlState, CsvSink
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'raw_data')
+
+PLACE = ['place_1'] + [None] * 20
+REVIEW = ['place_1', 'Author', 'en', 'en', 5, 'a week ago', 'Great food', 1700000000, False]
+
+
+def test_rollback_never_reuses_part_numbers(tmp_path):
+    sink = ParquetSink(str(tmp_path))
+    sink.write([('Kraków', PLACE, [REVIEW])])
+    position = sink.position()
+    sink.write([('Kraków', PLACE, [REVIEW])])
+    # A crash mid-write leaves a hidden temporary part behind
+    hidden = tmp_path / 'reviews' / f'crawl_date={sink.crawl_date}' / 'city=Kraków' / '.part-000009.parquet.tmp'
+    hidden.write_bytes(b'partial')
+    assert len(read_table(str(tmp_path), 'reviews')) == 2
+
+    resumed = ParquetSink(str(tmp_path))
+    resumed.rollback(position)
+    assert not hidden.exists()
+    resumed = ParquetSink(str(tmp_path))
+    resumed.write([('Kraków', PLACE, [REVIEW])])
+    numbers = sorted(resumed._part_number(path) for path in resumed._parts())
+    assert numbers == [1, 2, 5, 6]
+
+
+def test_checkpoint_rejects_another_sink_kind(tmp_path):
+    CrawlState(str(tmp_path / 'state'), ParquetSink(str(tmp_path / 'store')))
+    with pytest.raises(ValueError, match='parquet sink'):
+        CrawlState(str(tmp_path / 'state'), CsvSink(str(tmp_path / 'places.csv'), str(tmp_path / 'reviews.csv')))
+
+
+def test_import_csv_parses_date_strings(tmp_path):
+    path = os.path.join(DATA, 'random_choice_data.csv')
+    import_csv(path, str(tmp_path), 'reviews')
+    times = read_table(str(tmp_path), 'reviews', columns=['time'])['time']
+    expected = pd.to_datetime(pd.read_csv(path)['time'])
+    assert times.notna().sum() == expected.notna().sum() > 0
+    assert pd.to_datetime(times.dropna(), unit='s').tolist() == expected.dropna().tolist()
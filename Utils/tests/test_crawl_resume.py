@@ -0,0 +1,37 @@
+import pandas as pd
+
+from async_crawler import crawl
+from crawl_state import CrawlState, CsvSink
+from stub_places_server import StubPlacesServer
+
+LOCATIONS = {'Kraków': '50.06,19.94', 'Gdańsk': '54.35,18.65'}
+
+
+def _run(server, tmp_path):
+    sink = CsvSink(str(tmp_path / 'places.csv'), str(tmp_path / 'reviews.csv'))
+    state = CrawlState(str(tmp_path / 'state'), sink, batch_size=10)
+    crawl(LOCATIONS, 'test', state=state, base_url=server.base_url, qps=1000,
+          max_retries=0, backoff=0, page_token_delay=0)
+    return pd.read_csv(tmp_path / 'places.csv')['place_id'], state
+
+
+def test_resume_retries_failed_place_details(tmp_path):
+    server = StubPlacesServer(results_per_query=45)
+    server.start()
+    try:
+        all_ids = {place['place_id'] for location in LOCATIONS.values()
+                   for page in range(3) for place in server.nearby_page(location, page)[0]}
+        unavailable = sorted(all_ids)[::10]
+        server.unavailable_places = set(unavailable)
+
+        stored, state = _run(server, tmp_path)
+        assert set(stored) == all_ids - set(unavailable)
+        assert all(state.is_city_done(city) for city in LOCATIONS)
+        assert set(state.failed_places) == set(unavailable)
+
+        server.unavailable_places = set()
+        stored, state = _run(server, tmp_path)
+        assert sorted(stored) == sorted(all_ids)
+        assert state.failed_places == {}
+    finally:
+        server.shutdown()
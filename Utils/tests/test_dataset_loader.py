@@ -0,0 +1,22 @@
+import pytest
+
+from dataset_loader import load
+
+
+def test_load_rejects_unknown_aspect_labels(tmp_path):
+    path = tmp_path / 'reviews.csv'
+    path.write_text('place_id,text,food,service,atmosphere\n'
+                    'p1,great,Positive,,Negative\n'
+                    'p2,fine,Neutral,Positive,\n', encoding='utf-8')
+    with pytest.raises(ValueError, match="food values \\['Neutral'\\]"):
+        load(str(path), cache=False)
+
+
+def test_load_keeps_known_aspect_labels(tmp_path):
+    path = tmp_path / 'reviews.csv'
+    path.write_text('place_id,text,food,service,atmosphere\n'
+                    'p1,great,Positive,,Negative\n', encoding='utf-8')
+    df = load(str(path), cache=False)
+    assert df['food'].tolist() == ['Positive']
+    assert df['atmosphere'].tolist() == ['Negative']
+    assert df['service'].isna().all()
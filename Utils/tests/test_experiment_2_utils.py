@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from augmentation import ASPECTS
+from Experiment_2_utils import missing_comment_counts, plan_sentiments
+
+
+def _reviews(seed, n_rows=600):
+    rng = np.random.default_rng(seed)
+    # Skewed like the crawled data: food mostly rated, atmosphere mostly not
+    weights = {'food': [0.2, 0.7, 0.1], 'service': [0.5, 0.3, 0.2], 'atmosphere': [0.8, 0.05, 0.15]}
+    return pd.DataFrame({aspect: rng.choice(np.array([None, 'Positive', 'Negative'], dtype=object),
+                                            size=n_rows, p=weights[aspect])
+                         for aspect in ASPECTS})
+
+
+def test_plan_sentiments_balances_every_aspect():
+    for seed in range(5):
+        df = _reviews(seed)
+        planned = pd.DataFrame(plan_sentiments(missing_comment_counts(df), np.random.default_rng(seed)))
+        assert not planned.isna().all(axis=1).any()
+
+        combined = pd.concat([df, planned], ignore_index=True)
+        for aspect in ASPECTS:
+            counts = combined[aspect].value_counts(dropna=False)
+            assert len(counts) == 3
+            assert counts.max() - counts.min() <= 1, (seed, aspect, counts.to_dict())
+
+
+def test_plan_sentiments_is_seeded():
+    missing = missing_comment_counts(_reviews(0))
+    first = plan_sentiments(missing, np.random.default_rng(7))
+    second = plan_sentiments(missing, np.random.default_rng(7))
+    for aspect in ASPECTS:
+        assert (first[aspect] == second[aspect]).all()
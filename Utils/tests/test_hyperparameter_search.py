@@ -0,0 +1,39 @@
+import os
+
+from dataset_loader import load
+from features import FeatureStore
+from hyperparameter_search import candidates, hyperband, rung_sizes, successive_halving
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'raw_data')
+
+
+def test_rung_sizes_end_at_the_full_split():
+    for n_train in (2455, 2448, 1000, 150):
+        for min_rows in (50, 200, 818):
+            sizes = rung_sizes(n_train, min_rows, 3)
+            assert sizes[-1] == n_train
+            assert sizes[0] >= min(min_rows, n_train)
+
+
+def _search(method, tmp_path, min_rows=100):
+    grid = candidates(['sgd'], vectorizer_grid={'max_features': [500, 2000], 'sublinear_tf': [False, True]})
+    df = load(os.path.join(DATA, 'clean_data.csv'))
+    return method(df, grid, min_rows=min_rows, factor=3, feature_store=FeatureStore(str(tmp_path / 'features')),
+                  cache_dir=str(tmp_path / 'cache'), output=None)
+
+
+def test_every_bracket_ends_on_the_full_split(tmp_path):
+    trials = _search(hyperband, tmp_path)
+    n_train = trials['train_rows'].max()
+    last_rungs = trials.loc[trials.groupby('bracket')['rung'].idxmax()]
+    assert len(last_rungs) > 1
+    assert (last_rungs['train_rows'] == n_train).all()
+
+
+def test_single_survivor_is_trained_on_the_full_split(tmp_path):
+    # 12 candidates on rungs of 90, 272, 818 and 2455 rows: one is left after the second rung
+    trials = _search(successive_halving, tmp_path, min_rows=50)
+    assert sorted(trials['train_rows'].unique()) == [90, 272, 2455]
+    last = trials[trials['rung'] == trials['rung'].max()]
+    assert len(last) == 1
+    assert last['train_rows'].iloc[0] == trials['train_rows'].max() == 2455
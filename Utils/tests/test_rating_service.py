@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from rating import ASPECTS
+from rating_service import CsvReviewSource, RatingService
+
+
+class FakeClassifier:
+    """Positive for every aspect, or ``label`` for texts containing 'odd'."""
+
+    def __init__(self, label='Neutral'):
+        self.label = label
+
+    def predict_frame(self, texts):
+        labels = [self.label if 'odd' in text else 'Positive' for text in texts]
+        return pd.DataFrame({aspect: labels for aspect in ASPECTS})
+
+
+def test_process_rejects_unknown_labels():
+    service = RatingService(FakeClassifier())
+    with pytest.raises(ValueError, match='Neutral'):
+        service.process([('a', 'odd review', 0.0)])
+    assert service.score('a') is None
+
+
+def test_failed_batches_are_counted_and_the_loop_keeps_running():
+    service = RatingService(FakeClassifier(), batch_size=1, max_wait=0).start()
+    service.submit('a', 'odd review')
+    service.submit('b', 'great food')
+    service.stop()
+
+    metrics = service.metrics.snapshot()
+    assert metrics['errors'] == 1
+    assert 'Neutral' in metrics['last_error']
+    assert service.score('b')['reviews'] == 1
+
+
+def test_csv_source_never_splits_a_multiline_review(tmp_path):
+    path = tmp_path / 'reviews.csv'
+    record = 'p2,"Great food.\nSlow service, ""but"" friendly.\nWould return."\r\n'
+    head, tail = record[:30], record[30:]
+    assert '\n' in head
+    path.write_text('place_id,text\r\np1,Nice\r\n' + head, encoding='utf-8')
+
+    source = CsvReviewSource(str(path))
+    assert source.poll().values.tolist() == [['p1', 'Nice']]
+    assert source.poll() is None
+
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(tail)
+    assert source.poll().values.tolist() == [['p2', 'Great food.\nSlow service, "but" friendly.\nWould return.']]
@@ -0,0 +1,197 @@
+"""Geohash tiling planner for Nearby Search.
+
+Instead of scattering random points around each city centre (see
+``random places.py``), every city bounding box is covered by geohash cells
+small enough for one search circle to cover a whole cell. Tiles are searched
+from the centre outwards; a tile whose search brings back mostly places that
+are already known is marked *saturated*, and tiles with enough saturated
+neighbours are skipped. ``TilePlanner.stats()`` reports how many unique
+places each API request bought.
+"""
+
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE = {c: i for i, c in enumerate(BASE32)}
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def encode(lat, lng, precision):
+    """Geohash of a point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, value, even = [], 0, 0, True
+    while len(code) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(code)
+
+
+def bounds(geohash):
+    """``(lat_min, lat_max, lng_min, lng_max)`` of a geohash cell."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for c in geohash:
+        value = DECODE[c]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def center(geohash):
+    lat_min, lat_max, lng_min, lng_max = bounds(geohash)
+    return (lat_min + lat_max) / 2, (lng_min + lng_max) / 2
+
+
+def cell_size_deg(precision):
+    """``(height, width)`` in degrees of a cell at ``precision``."""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def neighbours(geohash):
+    """The eight cells around ``geohash``."""
+    lat, lng = center(geohash)
+    height, width = cell_size_deg(len(geohash))
+    return [encode(lat + dlat * height, lng + dlng * width, len(geohash))
+            for dlat in (-1, 0, 1) for dlng in (-1, 0, 1) if dlat or dlng]
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def half_diagonal_m(geohash):
+    lat_min, lat_max, lng_min, lng_max = bounds(geohash)
+    return haversine_m(lat_min, lng_min, lat_max, lng_max) / 2
+
+
+def precision_for_radius(radius_m, lat):
+    """Coarsest precision whose cells are fully covered by a search circle."""
+    for precision in range(1, 13):
+        height, width = cell_size_deg(precision)
+        diagonal = haversine_m(lat - height / 2, 0.0, lat + height / 2, width)
+        if diagonal / 2 <= radius_m:
+            return precision
+    return 12
+
+
+def cover_bbox(lat_min, lat_max, lng_min, lng_max, precision):
+    """Geohash cells at ``precision`` overlapping the bounding box."""
+    height, width = cell_size_deg(precision)
+    cells = []
+    lat = lat_min
+    while lat < lat_max + height:
+        lng = lng_min
+        while lng < lng_max + width:
+            cell = encode(min(lat, lat_max), min(lng, lng_max), precision)
+            if cell not in cells:
+                cells.append(cell)
+            lng += width
+        lat += height
+    return cells
+
+
+def city_bbox(lat, lng, extent_m):
+    """Square box reaching ``extent_m`` from the city centre in each direction."""
+    dlat = math.degrees(extent_m / EARTH_RADIUS_M)
+    dlng = math.degrees(extent_m / (EARTH_RADIUS_M * math.cos(math.radians(lat))))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+class TilePlanner:
+    """Orders, skips and scores the search tiles of several cities.
+
+    ``cities`` maps a city name to its ``(lat, lng)`` centre. A search is
+    saturated when less than ``saturation_threshold`` of its results are new
+    places; a tile is skipped once ``skip_after`` of its neighbours were
+    saturated.
+    """
+
+    def __init__(self, cities, radius=1000, extent_m=3000,
+                 saturation_threshold=0.2, skip_after=3):
+        self.radius = radius
+        self.saturation_threshold = saturation_threshold
+        self.skip_after = skip_after
+        self.tiles = {}
+        for city, (lat, lng) in cities.items():
+            precision = precision_for_radius(radius, lat)
+            cells = cover_bbox(*city_bbox(lat, lng, extent_m), precision)
+            # Centre first: dense areas saturate early and prune the outskirts
+            cells.sort(key=lambda cell: haversine_m(lat, lng, *center(cell)))
+            for cell in cells:
+                self.tiles[f'{city}_{cell}'] = cell
+        self.saturated = set()
+        self.searched = set()
+        self.skipped = set()
+        self.search_requests = 0
+        self.results = 0
+        self.new_places = 0
+
+    def location(self, tile_key):
+        """``'lat, lng'`` string of the tile centre, as the API expects."""
+        lat, lng = center(self.tiles[tile_key])
+        return f'{lat}, {lng}'
+
+    def should_skip(self, tile_key):
+        cell = self.tiles[tile_key]
+        saturated = sum(n in self.saturated for n in neighbours(cell))
+        return saturated >= self.skip_after
+
+    def next_wave(self, size, done=()):
+        """Up to ``size`` tiles to search next, skipping pruned ones."""
+        wave = []
+        for tile_key, cell in self.tiles.items():
+            if tile_key in self.searched or tile_key in self.skipped or tile_key in done:
+                continue
+            if self.should_skip(tile_key):
+                self.skipped.add(tile_key)
+                continue
+            wave.append(tile_key)
+            self.searched.add(tile_key)
+            if len(wave) == size:
+                break
+        return wave
+
+    def record(self, tile_key, results, new_places):
+        """Account one Nearby Search page; returns True if it was saturated."""
+        self.search_requests += 1
+        self.results += results
+        self.new_places += new_places
+        saturated = results == 0 or new_places < self.saturation_threshold * results
+        if saturated:
+            self.saturated.add(self.tiles[tile_key])
+        return saturated
+
+    def stats(self):
+        return {
+            'tiles': len(self.tiles),
+            'searched': len(self.searched),
+            'skipped': len(self.skipped),
+            'search_requests': self.search_requests,
+            'results': self.results,
+            'unique_places': self.new_places,
+            'unique_places_per_request': self.new_places / self.search_requests if self.search_requests else 0.0,
+        }